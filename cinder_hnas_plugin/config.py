@@ -5,7 +5,117 @@ from tempest import config
 HNASGroup = [
     cfg.ListOpt(name="enabled_backends",
                 item_type=oslo_types.String(),
-                help="Analogous to the cinder option of the same name.")
+                help="Analogous to the cinder option of the same name."),
+    cfg.FloatOpt(name="waiter_initial_interval",
+                 default=0.5,
+                 help="Seconds to wait before the second poll of a waiter. "
+                      "Subsequent polls back off exponentially up to the "
+                      "client's build_interval."),
+    cfg.FloatOpt(name="waiter_backoff_factor",
+                 default=2.0,
+                 help="Factor by which waiters grow their poll interval."),
+    cfg.FloatOpt(name="waiter_jitter",
+                 default=0.1,
+                 help="Random fraction added to or removed from each waiter "
+                      "poll interval."),
+    cfg.IntOpt(name="max_parallel_backends",
+               default=4,
+               help="How many backends a scenario may exercise at the same "
+                    "time. Set to 1 to run scenarios against one backend "
+                    "after the other."),
+    cfg.StrOpt(name="topology_cache_file",
+               help="Path of a JSON file in which the EVS layout of each "
+                    "backend is cached between test runs. If unset, the "
+                    "layout is only cached for the duration of a run."),
+    cfg.IntOpt(name="topology_cache_ttl",
+               default=3600,
+               help="Seconds after which a cached EVS layout is "
+                    "rediscovered."),
+    cfg.IntOpt(name="instance_pool_size",
+               default=0,
+               help="Number of booted, ssh-ready instances kept idle for "
+                    "each boot spec and leased to tests instead of booting "
+                    "new ones. 0 disables the pool."),
+    cfg.StrOpt(name="fill_mode",
+               default="random",
+               choices=["random", "pattern"],
+               help="How tests fill volumes with data: 'random' reads from "
+                    "/dev/urandom, 'pattern' writes seeded blocks, faster "
+                    "to produce and checked in HNAS without reading them "
+                    "back, but highly compressible."),
+    cfg.IntOpt(name="fill_block_size_kb",
+               default=1024,
+               help="Size in KB of the blocks written by the 'pattern' "
+                    "fill mode. Must divide 1024."),
+    cfg.StrOpt(name="results_dir",
+               help="Directory in which benchmarks and timelines are saved "
+                    "as JSON. Defaults to cinder-hnas-results in the "
+                    "system's temporary directory."),
+    cfg.BoolOpt(name="run_benchmarks",
+                default=False,
+                help="Whether to run the benchmark tests, which take long "
+                     "and measure rather than verify."),
+    cfg.ListOpt(name="benchmark_workloads",
+                default=["write", "read", "randwrite", "randread"],
+                help="I/O patterns run by the guest I/O benchmark. Any of "
+                     "read, write, randread and randwrite."),
+    cfg.ListOpt(name="benchmark_block_sizes_kb",
+                item_type=oslo_types.Integer(),
+                default=[4, 1024],
+                help="Block sizes, in KB, of the guest I/O benchmark."),
+    cfg.ListOpt(name="benchmark_queue_depths",
+                item_type=oslo_types.Integer(),
+                default=[1, 16],
+                help="Queue depths of the guest I/O benchmark."),
+    cfg.IntOpt(name="benchmark_size_mb",
+               default=256,
+               help="MB of the volume covered by each guest I/O benchmark "
+                    "workload."),
+    cfg.IntOpt(name="benchmark_iterations",
+               default=5,
+               help="How many times the control plane benchmark runs its "
+                    "sequence of cinder operations on each pool."),
+    cfg.BoolOpt(name="ssh_profiling",
+                default=False,
+                help="Whether to record every command run over ssh and "
+                     "report the most expensive and most frequent ones "
+                     "when the test run ends."),
+    cfg.IntOpt(name="ssc_session_limit",
+               default=5,
+               help="How many SSC sessions HNAS accepts at the same time."),
+    cfg.IntOpt(name="ssc_sessions_reserved",
+               default=3,
+               help="How many of the SSC sessions of each HNAS are left to "
+                    "cinder-volume. The tests never hold more than "
+                    "ssc_session_limit minus this many at once."),
+    cfg.IntOpt(name="ssc_queue_timeout",
+               default=600,
+               help="Seconds an ssc call waits for a free SSC session "
+                    "before failing, 0 to wait forever."),
+    cfg.StrOpt(name="cinder_volume_log",
+               default="/home/ubuntu/devstack_logs/c-vol.log",
+               help="Log file of cinder-volume, which must be readable by "
+                    "the tests."),
+    cfg.BoolOpt(name="correlate_cinder_log",
+                default=False,
+                help="Whether to match the operations of every test with "
+                     "the requests cinder-volume logged for them, and "
+                     "report where their time went. Requires "
+                     "cinder_volume_log."),
+    cfg.StrOpt(name="sweep_orphans",
+               default="off",
+               choices=["off", "dry-run", "delete"],
+               help="What to do, before the first test, with the files "
+                    "failed runs left in the cinder export directories of "
+                    "the backends: nothing, list them, or remove them."),
+    cfg.IntOpt(name="orphan_min_age",
+               default=60,
+               help="Minutes since a file was last modified for the "
+                    "sweeper to consider it an orphan."),
+    cfg.BoolOpt(name="save_timelines",
+                default=False,
+                help="Whether to log the timeline of every test and save "
+                     "it in results_dir, as JSON and as a Gantt chart."),
 ]
 
 hnas_group = cfg.OptGroup(name='hnas',
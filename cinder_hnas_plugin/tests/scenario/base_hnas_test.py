@@ -13,67 +13,357 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import functools
+import hashlib
+
 from oslo_log import log as logging
+import six
+from tempest.common import compute
 from tempest import config
+from tempest.lib.common import rest_client
 from tempest.lib.common.utils import test_utils
 from tempest.scenario import manager
+import testtools
 
+from cinder_hnas_plugin.tests.utils import cinder_log
+from cinder_hnas_plugin.tests.utils import concurrency
 from cinder_hnas_plugin.tests.utils import data_utils
+from cinder_hnas_plugin.tests.utils import instance_pool
+from cinder_hnas_plugin.tests.utils import log_watch
+from cinder_hnas_plugin.tests.utils import merkle
+from cinder_hnas_plugin.tests.utils import regions
+from cinder_hnas_plugin.tests.utils import remote_client
+from cinder_hnas_plugin.tests.utils import resource_tracker
+from cinder_hnas_plugin.tests.utils import results
+from cinder_hnas_plugin.tests.utils import sweeper
+from cinder_hnas_plugin.tests.utils import timeline
 from cinder_hnas_plugin.tests.utils import waiters
 from cinder_hnas_plugin.tests.utils import clients
-import time
+import sys
+import threading
 
 CONF = config.CONF
 LOG = logging.getLogger(__name__)
 
+# Size of the regions compared by verify_volume_writable, small enough to
+# tell where the data differs without fetching it
+VERIFY_CHUNK_MB = 64
+
 
 class BaseHNASTest(manager.ScenarioTest):
 
     credentials = ['primary', 'admin']
 
+    # guards the creation of the instance pool of each class
+    _instance_pool_lock = threading.Lock()
+
     @classmethod
     def setup_clients(cls):
         super(BaseHNASTest, cls).setup_clients()
         if CONF.volume_feature_enabled.api_v1:
             cls.admin_volume_types_client = cls.os_adm.volume_types_client
+            cls.admin_volumes_client = cls.os_adm.volumes_client
+            cls.admin_snapshots_client = cls.os_adm.snapshots_client
             cls.quotas_client = cls.os.volume_quotas_client
         else:
             cls.admin_volume_types_client = cls.os_adm.volume_types_v2_client
+            cls.admin_volumes_client = cls.os_adm.volumes_v2_client
+            cls.admin_snapshots_client = cls.os_adm.snapshots_v2_client
             cls.quotas_client = cls.os.volume_quotas_v2_client
 
     @classmethod
     def resource_setup(cls):
         super(BaseHNASTest, cls).resource_setup()
+        if CONF.hnas.save_timelines or CONF.hnas.correlate_cinder_log:
+            # Every API call shows up in the timeline of the test that made
+            # it. Patches RestClient for the whole process, hence the
+            # options.
+            timeline.instrument(
+                rest_client.RestClient, 'request', 'api',
+                lambda client, method, url, *args, **kwargs:
+                    '%s %s' % (method, url.split('?')[0]))
         cls.tenant_id = cls.quotas_client.tenant_id
-
-    def setUp(self):
-        super(BaseHNASTest, self).setUp()
-        backends = clients.HNASCinderBackend.create_backends_from_conf()
-        self.hnas_backends = backends
-
-        # create a volume type for each backend. The name of the volume type
-        # will be the backend's volume_backend_name
-        for backend in backends:
+        cls.volume_types = {}
+        cls.instance_pool = None
+        cls.hnas_backends = (
+            clients.HNASCinderBackend.create_backends_from_conf())
+        sweeper.sweep_once(cls.hnas_backends, cls.admin_volumes_client,
+                           cls.admin_snapshots_client)
+
+        # Create a volume type for each backend and pool, shared by every
+        # test of the class. Tests must not modify these types, see
+        # create_private_volume_type.
+        for backend in cls.hnas_backends:
             backend.vtype = []
             for pool_name in backend.svc_pool_names:
-                vtype = self.create_volume_type(
+                vtype = cls._create_volume_type(
+                    cls.admin_volume_types_client,
                     name=backend.name,
                     volume_backend_name=backend.volume_backend_name,
                     service_label=pool_name)
+                cls.volume_types[(backend.name, pool_name)] = vtype
                 backend.vtype.append(vtype)
 
+    @classmethod
+    def resource_cleanup(cls):
+        if getattr(cls, 'instance_pool', None) is not None:
+            cls.instance_pool.shutdown()
+            cls.instance_pool = None
+        for vtype in getattr(cls, 'volume_types', {}).values():
+            test_utils.call_and_ignore_notfound_exc(
+                cls.admin_volume_types_client.delete_volume_type,
+                vtype['id'])
+        super(BaseHNASTest, cls).resource_cleanup()
+
+    def setUp(self):
+        self._cleanup_scope = threading.local()
+        super(BaseHNASTest, self).setUp()
+        self._ssc_rm_refs = None
+        self._leased_instances = {}
+        self._tracker = None
+        self._tracker_lock = threading.Lock()
+
+        self.timeline = timeline.Timeline(self.id())
+        timeline.activate(self.timeline)
+        self.addCleanup(self._save_timeline)
+        self.addOnException(lambda exc_info: self.timeline.mark_failed())
+        if CONF.hnas.correlate_cinder_log:
+            self._cinder_log = log_watch.get_watcher().subscribe(
+                cinder_log.REQUEST_LINE_REGEX)
+            self.addCleanup(self._save_backend_timings)
+
+    def step(self, message, *args):
+        """Logs the beginning of a scenario step and times it
+
+        Steps are written like "3 -> Doing something" and last until the
+        next step of the same level ("3.1 -> ..." is nested under "3").
+        """
+        LOG.debug(message, *args)
+        self.timeline.step(message % args if args else message)
+
+    def _save_timeline(self):
+        timeline.activate(None)
+        self.timeline.close()
+        if not CONF.hnas.save_timelines:
+            return
+        name = self.id().rsplit('.', 1)[-1]
+        gantt = self.timeline.format_gantt()
+        LOG.info("Timeline of %s:\n%s", self.id(), gantt)
+        results.write_json('timeline', self.timeline.to_dict(), name=name)
+        results.write_text('timeline', gantt, name=name)
+
+    def _save_backend_timings(self):
+        """Reports how cinder-volume spent the time of the test operations
+
+        Runs before _save_timeline, once the resources of the test are gone.
+        """
+        if not self._cinder_log.watcher.sync():
+            LOG.warning("%s was not read up to its end, the cinder-volume "
+                        "timings of %s may be incomplete.",
+                        self._cinder_log.watcher.path, self.id())
+        self._cinder_log.cancel()
+        traces = cinder_log.parse_requests(
+            line.text for line in self._cinder_log.lines)
+        report = cinder_log.correlate(
+            cinder_log.client_operations(self.timeline), traces)
+        if not report:
+            return
+        LOG.info("cinder-volume timings of %s:\n%s", self.id(),
+                 cinder_log.format_report(report))
+        results.write_json('backend-timings', report,
+                           name=self.id().rsplit('.', 1)[-1])
+
+    def addCleanup(self, function, *args, **kwargs):
+        # Scenario bodies run by run_on_backends keep their cleanups to
+        # themselves, see _run_isolated.
+        scope = getattr(self, '_cleanup_scope', None)
+        stack = getattr(scope, 'stack', None)
+        if stack is None:
+            return super(BaseHNASTest, self).addCleanup(function, *args,
+                                                        **kwargs)
+        stack.append((function, args, kwargs))
+
+    def run_on_backends(self, scenario, per_pool=False, max_workers=None):
+        """Runs a scenario body against every backend concurrently.
+
+        Each body runs in a thread of its own, with its own cleanups: the
+        cleanups registered while a body runs are executed by that same
+        thread as soon as the body finishes, so a failure on one backend
+        neither stops nor leaks into the others. Once every body is done,
+        all failures are reported together.
+
+        :param scenario: callable. Receives an HNASCinderBackend, plus the
+            index of a svc pool if per_pool is True.
+        :param per_pool: Boolean. Whether to run the body once for each svc
+            pool of each backend rather than once per backend.
+        :param max_workers: int. How many bodies may run at the same time.
+            Defaults to CONF.hnas.max_parallel_backends.
+        """
+        if max_workers is None:
+            max_workers = CONF.hnas.max_parallel_backends
+
+        targets = []
+        for backend in self.hnas_backends:
+            if per_pool:
+                targets.extend((backend, idx)
+                               for idx in range(len(backend.svc_pool_names)))
+            else:
+                targets.append((backend,))
+
+        parent = self.timeline.current_span()
+        outcomes = concurrency.run_concurrently(
+            self._run_isolated, [(scenario, t, parent) for t in targets],
+            max_workers=max_workers, name='scenario')
+
+        errors = []
+        for exc_infos, exc_info in outcomes:
+            errors.extend(exc_infos or [])
+            if exc_info is not None:
+                errors.append(exc_info)
+        if len(errors) == 1:
+            six.reraise(*errors[0])
+        elif errors:
+            raise testtools.MultipleExceptions(*errors)
+
+    def _run_isolated(self, scenario, args, parent=None):
+        """Runs scenario(*args) followed by the cleanups it registered.
+
+        :param parent: timeline.Span. The span the run is timed under.
+        :returns: list. The exc_info of every failure, either from the
+            scenario itself or from its cleanups.
+        """
+        target = '/'.join(str(getattr(a, 'name', a)) for a in args)
+        LOG.debug("Running %s on %s.", scenario.__name__, target)
+        exc_infos = []
+        with self.timeline.span(target, parent=parent) as span:
+            with self.captured_cleanups() as stack:
+                try:
+                    with self.timeline.span('body'):
+                        scenario(*args)
+                except Exception:
+                    exc_infos.append(sys.exc_info())
+            with self.timeline.span('cleanup'):
+                exc_infos.extend(self._run_cleanups(stack))
+            if exc_infos:
+                span.close('error')
+        return exc_infos
+
+    @contextlib.contextmanager
+    def captured_cleanups(self):
+        """Collects the cleanups registered within the block.
+
+        Instead of being registered with the test, the cleanups are
+        appended to the yielded list as tuples <function, args, kwargs> and
+        it is up to the caller to run them, see _run_cleanups.
+        """
+        scope = self._cleanup_scope
+        previous = (getattr(scope, 'stack', None),
+                    getattr(scope, 'tracker', None),
+                    getattr(scope, 'ssc_rm_refs', None))
+        stack = []
+        scope.stack = stack
+        scope.tracker = None
+        scope.ssc_rm_refs = None
+        try:
+            yield stack
+        finally:
+            scope.stack, scope.tracker, scope.ssc_rm_refs = previous
+
+    @staticmethod
+    def _run_cleanups(stack):
+        """Runs captured cleanups in reverse order, returning failures"""
+        exc_infos = []
+        for function, f_args, f_kwargs in reversed(stack):
+            try:
+                function(*f_args, **f_kwargs)
+            except Exception:
+                exc_infos.append(sys.exc_info())
+        return exc_infos
+
+    def _resource_tracker(self):
+        """Returns the ResourceTracker of the current cleanup scope.
+
+        The tracker is created along with the first resource of the scope,
+        and its teardown registered as a cleanup then. Cleanups registered
+        afterwards (e.g. detaching a volume from an instance, or deleting
+        an instance booted from a volume) thus run before it.
+        """
+        scope = self._cleanup_scope
+        captured = getattr(scope, 'stack', None) is not None
+        with self._tracker_lock:
+            tracker = scope.tracker if captured else self._tracker
+            if tracker is None:
+                tracker = self._new_resource_tracker()
+                if captured:
+                    scope.tracker = tracker
+                else:
+                    self._tracker = tracker
+                self.addCleanup(tracker.teardown_or_raise)
+        return tracker
+
+    def _new_resource_tracker(self):
+        tracker = resource_tracker.ResourceTracker()
+        # Detailed lists, summaries have no status to tell error_deleting by
+        for kind, client, list_name in (
+                ('volume', self.volumes_client, 'volumes'),
+                ('snapshot', self.snapshots_client, 'snapshots')):
+            tracker.register_kind(
+                kind, functools.partial(
+                    waiters.wait_for_resources_deletion,
+                    lambda c=client, n=list_name:
+                        getattr(c, 'list_' + n)(detail=True)[n],
+                    timeout=client.build_timeout,
+                    max_interval=client.build_interval, kind=kind))
+        # images and volume types were never waited for
+        tracker.register_kind('image')
+        tracker.register_kind('volume_type')
+        return tracker
+
+    def _track(self, kind, resource_id, delete, parents=()):
+        """Deletes a resource when the test (or scenario) is cleaned up.
+
+        :param delete: callable. Deletes a resource given its id.
+        :param parents: iterable of tuples <kind, id>. Resources to be
+            deleted only after this one.
+        """
+        self._resource_tracker().add(
+            kind, resource_id,
+            functools.partial(test_utils.call_and_ignore_notfound_exc,
+                              delete),
+            parents)
+
     def create_volume_type(self, client=None, name=None,
                            volume_backend_name=None, service_label=None):
         if not client:
             client = self.admin_volume_types_client
+        vtype = self._create_volume_type(client, name, volume_backend_name,
+                                         service_label)
+        self.assertIn('id', vtype)
+        self._track('volume_type', vtype['id'], client.delete_volume_type)
+        return vtype
+
+    def create_private_volume_type(self, hnas_backend, svc_idx=0):
+        """Creates a copy of a backend's shared volume type for this test.
+
+        The volume types in hnas_backend.vtype are shared by all tests of
+        the class. Tests that need to modify a volume type must use a
+        private one instead, which is deleted at the end of the test.
+        """
+        return self.create_volume_type(
+            name=hnas_backend.name,
+            volume_backend_name=hnas_backend.volume_backend_name,
+            service_label=hnas_backend.svc_pool_names[svc_idx])
+
+    @staticmethod
+    def _create_volume_type(client, name=None, volume_backend_name=None,
+                            service_label=None):
         if not name:
             name = 'generic'
         randomized_name = data_utils.rand_name('scenario-type-' + name)
         LOG.debug("Creating a volume type: %s", randomized_name)
         vtype = client.create_volume_type(
             name=randomized_name)['volume_type']
-        self.assertIn('id', vtype)
-        self.addCleanup(client.delete_volume_type, vtype['id'])
 
         extra_specs_dict = {}
         if volume_backend_name:
@@ -81,18 +371,67 @@ class BaseHNASTest(manager.ScenarioTest):
         if service_label:
             extra_specs_dict['service_label'] = service_label
         if extra_specs_dict:
-            client.create_volume_type_extra_specs(
-                vtype['id'], extra_specs_dict)
+            try:
+                client.create_volume_type_extra_specs(
+                    vtype['id'], extra_specs_dict)
+            except Exception:
+                test_utils.call_and_ignore_notfound_exc(
+                    client.delete_volume_type, vtype['id'])
+                raise
 
         return vtype
 
-    def vol_exists_in_some_backend(self, vol_id):
+    def vol_exists_in_some_backend(self, vol_id, timeout=150):
+        """Looks a volume up in every backend at the same time.
+
+        Each backend is polled (see waiters.retry) in a thread of its own,
+        and the lookups still running are cancelled as soon as one of them
+        finds the volume. Backends sharing an HNAS all see its file, which
+        only counts for the backend whose exports hold it.
+
+        :param timeout: int. Seconds each backend is given to show the
+            volume.
+        :returns: HNASVolumeReference, whose hnas_backend is the backend
+            holding the volume, or False if none does.
+        """
+        found = six.moves.queue.Queue()
+        cancel = threading.Event()
+
+        def _get_reference(backend):
+            entry = backend.volume_index.lookup(vol_id)
+            if entry is None:
+                return None
+            svc_idx = backend.export_index(entry.unix_path)
+            if svc_idx is None:
+                return None
+            vol_ref = backend.get_volume_reference(vol_id, svc_idx)
+            return vol_ref if vol_ref.exists() else None
+
+        def _lookup(backend):
+            vol_ref = None
+            try:
+                vol_ref = waiters.retry(_get_reference, (backend,),
+                                        timeout=timeout, cancel=cancel)
+            except Exception:
+                LOG.exception("Looking volume %s up in %s failed.", vol_id,
+                              backend.name)
+            finally:
+                found.put((backend, vol_ref))
+
         for backend in self.hnas_backends:
-            vol_ref = backend.get_volume_reference(vol_id)
-            if self.retry(vol_ref.exists):
+            thread = threading.Thread(target=_lookup, args=(backend,),
+                                      name='lookup-%s' % backend.name)
+            thread.daemon = True
+            thread.start()
+
+        for _ in self.hnas_backends:
+            backend, vol_ref = found.get()
+            if vol_ref:
+                cancel.set()
+                LOG.info("Volume %s lives in backend %s.", vol_id,
+                         backend.name)
                 return vol_ref
-        else:
-            return False
+        return False
 
     def vol_exists_in_cinder(self, vol_id):
         vol_list = self.volumes_client.list_volumes()['volumes']
@@ -117,42 +456,49 @@ class BaseHNASTest(manager.ScenarioTest):
             such VM is destroyed.
         :returns: Tuple<instance, ssh_client>. An object representing the VM
             as well as an ssh connection to it.
+
+        If CONF.hnas.instance_pool_size is set, instances booted from an
+        image are leased from the class instance pool rather than booted
+        for each test. They are returned to the pool when the test ends,
+        unless deleted with delete_instance.
         """
         self.assertTrue(source_type in ['volume', 'image', 'snapshot'])
 
-        keypair = self.create_keypair()
-        security_group = self._create_security_group()
-        security_groups = [{'name': security_group['name']}]
-
-        kwargs = {}
-        bd_map_v2 = {}
-
-        bd_map_v2['destination_type'] = (
-            'volume' if create_backing_vol else 'local')
-
         if source_uuid is None:
             source_uuid = CONF.compute.image_ref
-
-        # image_id must be a valid IMAGE uuid even if we're booting from a
-        # volume or a snapshot, otherwise nova complains. The functions down
-        # the stack will convert None to the default image if we pass None
-        # in image_id
-        image_id = source_uuid if source_type == 'image' else None
-        bd_map_v2['uuid'] = source_uuid
-
         if volume_size is None:
             volume_size = CONF.volume.volume_size
-        bd_map_v2['volume_size'] = volume_size
 
-        bd_map_v2['source_type'] = source_type
-        bd_map_v2['boot_index'] = 0
-        bd_map_v2['delete_on_termination'] = delete_vol_on_termination
-        kwargs['block_device_mapping_v2'] = [bd_map_v2]
+        spec = instance_pool.InstanceSpec(
+            create_backing_vol=create_backing_vol, volume_size=volume_size,
+            source_uuid=source_uuid, source_type=source_type,
+            delete_vol_on_termination=delete_vol_on_termination,
+            flavor=CONF.compute.flavor_ref)
+
+        # Volumes and snapshots used as boot sources belong to the test
+        # that created them, so such instances can not be shared.
+        if CONF.hnas.instance_pool_size <= 0 or source_type != 'image':
+            return self._boot_instance_and_client(spec)
+
+        pool = self._get_instance_pool()
+        pooled = pool.lease(spec)
+        self._leased_instances[pooled.id] = pooled
+        self.addCleanup(self._release_instance, pooled)
+        instance = self.servers_client.show_server(pooled.id)['server']
+        return instance, pooled.ssh_client
+
+    def _boot_instance_and_client(self, spec):
+        """Boots an instance as described by an InstanceSpec"""
+        keypair = self.create_keypair()
+        security_group = self._create_security_group()
+        security_groups = [{'name': security_group['name']}]
+
+        image_id, kwargs = self._boot_source_kwargs(spec)
 
         LOG.debug("Creating test server...")
         instance = self.create_server(
             image_id=image_id,
-            flavor=CONF.compute.flavor_ref,
+            flavor=spec.flavor,
             key_name=keypair['name'],
             security_groups=security_groups,
             config_drive=CONF.compute_feature_enabled.config_drive,
@@ -166,12 +512,167 @@ class BaseHNASTest(manager.ScenarioTest):
             private_key=keypair['private_key'])
         return instance, ssh_client
 
+    @staticmethod
+    def _boot_source_kwargs(spec):
+        """Returns the image id and block device mapping of an InstanceSpec
+
+        :returns: tuple<string, dict>. The image_id and the extra kwargs to
+            create the server with.
+        """
+        bd_map_v2 = {}
+
+        bd_map_v2['destination_type'] = (
+            'volume' if spec.create_backing_vol else 'local')
+
+        # image_id must be a valid IMAGE uuid even if we're booting from a
+        # volume or a snapshot, otherwise nova complains. The functions down
+        # the stack will convert None to the default image if we pass None
+        # in image_id
+        image_id = (spec.source_uuid if spec.source_type == 'image'
+                    else None)
+        bd_map_v2['uuid'] = spec.source_uuid
+
+        bd_map_v2['volume_size'] = spec.volume_size
+
+        bd_map_v2['source_type'] = spec.source_type
+        bd_map_v2['boot_index'] = 0
+        bd_map_v2['delete_on_termination'] = spec.delete_vol_on_termination
+        return image_id, {'block_device_mapping_v2': [bd_map_v2]}
+
+    def _get_instance_pool(self):
+        cls = type(self)
+        # scenario bodies run by run_on_backends may get here at once
+        with cls._instance_pool_lock:
+            if cls.instance_pool is None:
+                cls.instance_pool = instance_pool.InstancePool(
+                    boot=cls._boot_pooled_instance,
+                    scrub=cls._scrub_pooled_instance,
+                    size=CONF.hnas.instance_pool_size)
+        return cls.instance_pool
+
+    @classmethod
+    def _boot_pooled_instance(cls, spec):
+        """Boots an instance whose cleanups are kept by the pool.
+
+        Pooled instances outlive the test that first asks for the pool, so
+        they are booted with the clients of the class, and everything
+        created along with them is cleaned up by the pool, at the latest
+        when resource_cleanup shuts it down.
+
+        :returns: tuple<instance, ssh_client, cleanups> as expected by
+            InstancePool.
+        """
+        cleanups = []
+
+        def _add_cleanup(function, *args, **kwargs):
+            cleanups.append((function, args, kwargs))
+
+        try:
+            name = data_utils.rand_name(cls.__name__)
+            keypair = cls.keypairs_client.create_keypair(
+                name=name)['keypair']
+            _add_cleanup(cls.keypairs_client.delete_keypair, keypair['name'])
+
+            security_group = (
+                cls.compute_security_groups_client.create_security_group(
+                    name=name, description=name + " description")
+                ['security_group'])
+            _add_cleanup(test_utils.call_and_ignore_notfound_exc,
+                         cls.compute_security_groups_client
+                         .delete_security_group, security_group['id'])
+            for rule in ({'ip_protocol': 'tcp', 'from_port': 22,
+                          'to_port': 22},
+                         {'ip_protocol': 'icmp', 'from_port': -1,
+                          'to_port': -1}):
+                (cls.compute_security_group_rules_client
+                 .create_security_group_rule(
+                     parent_group_id=security_group['id'],
+                     cidr='0.0.0.0/0', **rule))
+
+            image_id, kwargs = cls._boot_source_kwargs(spec)
+
+            LOG.debug("Creating pooled server...")
+            body, _ = compute.create_test_server(
+                cls.manager,
+                tenant_network=cls.get_tenant_network(),
+                wait_until='ACTIVE',
+                name=name,
+                image_id=image_id,
+                flavor=spec.flavor,
+                key_name=keypair['name'],
+                security_groups=[{'name': security_group['name']}],
+                config_drive=CONF.compute_feature_enabled.config_drive,
+                **kwargs)
+            _add_cleanup(waiters.wait_for_server_termination,
+                         cls.servers_client, body['id'])
+            _add_cleanup(test_utils.call_and_ignore_notfound_exc,
+                         cls.servers_client.delete_server, body['id'])
+            instance = cls.servers_client.show_server(body['id'])['server']
+
+            fip = cls.compute_floating_ips_client.create_floating_ip()[
+                'floating_ip']
+            _add_cleanup(test_utils.call_and_ignore_notfound_exc,
+                         cls.compute_floating_ips_client.delete_floating_ip,
+                         fip['id'])
+            cls.compute_floating_ips_client.associate_floating_ip_to_server(
+                fip['ip'], instance['id'])
+
+            LOG.debug("Creating an ssh connection to pooled vm...")
+            ssh_client = remote_client.RemoteClient(
+                fip['ip'], CONF.validation.image_ssh_user,
+                pkey=keypair['private_key'], server=instance,
+                servers_client=cls.servers_client)
+            ssh_client.validate_authentication()
+        except Exception:
+            exc_info = sys.exc_info()
+            cls._run_cleanups(cleanups)
+            six.reraise(*exc_info)
+        return instance, ssh_client, cleanups
+
+    @classmethod
+    def _scrub_pooled_instance(cls, pooled):
+        """Detaches whatever a test attached to a pooled instance.
+
+        :returns: Boolean. Whether the instance can be leased again.
+        """
+        server = cls.servers_client.show_server(pooled.id)['server']
+        if server['status'] != 'ACTIVE':
+            LOG.warning("Pooled instance %s is %s, not reusing it.",
+                        pooled.id, server['status'])
+            return False
+
+        boot_volumes = set(
+            v['id'] for v in pooled.instance.get(
+                'os-extended-volumes:volumes_attached', []))
+        attachments = cls.servers_client.list_volume_attachments(
+            pooled.id)['volumeAttachments']
+        for attachment in attachments:
+            vol_id = attachment['volumeId']
+            if vol_id in boot_volumes:
+                continue
+            LOG.debug("Detaching volume %s from pooled instance %s.",
+                      vol_id, pooled.id)
+            cls.servers_client.detach_volume(pooled.id, vol_id)
+            waiters.wait_for_volume_status(cls.volumes_client, vol_id,
+                                           'available')
+        return True
+
+    def _release_instance(self, pooled):
+        if self._leased_instances.pop(pooled.id, None) is not None:
+            self.instance_pool.release(pooled)
+
     def delete_instance(self, inst_id):
         LOG.debug("Deleting instance %s.", inst_id)
         self.servers_client.delete_server(inst_id)
         waiters.wait_for_server_termination(self.servers_client, inst_id)
         LOG.info("Deleted instance %s.", inst_id)
 
+        # A leased instance is gone for good, get rid of what was created
+        # along with it (keypair, security group, floating ip).
+        pooled = self._leased_instances.pop(inst_id, None)
+        if pooled is not None:
+            self.instance_pool.discard(pooled)
+
     def extend_volume(self, hnas_vol_ref, new_size):
         vol_id = hnas_vol_ref.uuid
         self.volumes_client.extend_volume(vol_id, new_size=new_size)
@@ -184,7 +685,7 @@ class BaseHNASTest(manager.ScenarioTest):
 
     def create_volume(self, hnas_backend, size=None, name=None,
                       snapshot_id=None, imageRef=None, source_volid=None,
-                      idx_type=0):
+                      idx_type=0, volume_type=None):
         """Creates a cinder volume and HNAS vol reference.
 
         :param hnas_backend: HNASCinderBackend. An object representing the HNAS
@@ -202,10 +703,58 @@ class BaseHNASTest(manager.ScenarioTest):
         :param idx_type: int. Since vtypes is a list of types created in
             Cinder, using idx_type it can be determined which type should be
             used. Default is 0 (so, using the first type in list).
+        :param volume_type: dict. A volume type to use instead of the one
+            picked by idx_type, e.g. one returned by
+            create_private_volume_type.
         :returns: tuple<volume, HNASVolumeReference> A tuple containing the
             volume dict as returned by cinder and a reference to its backing
             file in HNAS.
         """
+        volume = self._request_volume(hnas_backend, size, name, snapshot_id,
+                                      imageRef, source_volid, idx_type,
+                                      volume_type)
+        waiters.wait_for_volume_status(self.volumes_client,
+                                       volume['id'], 'available')
+        # The volume retrieved on creation has a non-up-to-date status.
+        # Retrieval after it becomes active ensures correct details.
+        volume = self.volumes_client.show_volume(volume['id'])['volume']
+        vol_ref = hnas_backend.get_volume_reference(volume['id'])
+
+        return volume, vol_ref
+
+    def create_volumes(self, hnas_backend, specs):
+        """Creates several cinder volumes at once.
+
+        All volumes are requested up front, sharing a name, and then waited
+        for together with a single volume list call per poll, filtered by
+        that name.
+
+        :param hnas_backend: HNASCinderBackend. The backend in which the
+            volumes will be created.
+        :param specs: list<dict>. One dict per volume, holding any argument
+            accepted by create_volume but name.
+        :returns: list<tuple<volume, HNASVolumeReference>>. One tuple per
+            spec, in the same order, as returned by create_volume.
+        """
+        name = data_utils.rand_name(self.__class__.__name__)
+        volumes = [self._request_volume(hnas_backend, name=name, **spec)
+                   for spec in specs]
+        name_key = 'display_name' if 'display_name' in volumes[0] else 'name'
+        details = waiters.wait_for_volumes_status(
+            self.volumes_client, [v['id'] for v in volumes], 'available',
+            params={name_key: name})
+
+        return [(details[v['id']],
+                 hnas_backend.get_volume_reference(v['id']))
+                for v in volumes]
+
+    def _request_volume(self, hnas_backend, size=None, name=None,
+                        snapshot_id=None, imageRef=None, source_volid=None,
+                        idx_type=0, volume_type=None):
+        """Asks cinder for a volume without waiting for it to be available.
+
+        See create_volume for the meaning of the parameters.
+        """
         kwargs = {}
 
         if name is None:
@@ -222,55 +771,81 @@ class BaseHNASTest(manager.ScenarioTest):
         if imageRef is not None:
             kwargs['imageRef'] = imageRef
 
-        kwargs['volume_type'] = hnas_backend.vtype[idx_type]['name']
+        if volume_type is None:
+            volume_type = hnas_backend.vtype[idx_type]
+        kwargs['volume_type'] = volume_type['name']
 
         if source_volid is not None:
             kwargs['source_volid'] = source_volid
 
         volume = self.volumes_client.create_volume(**kwargs)['volume']
 
-        self.addCleanup(self.volumes_client.wait_for_resource_deletion,
-                        volume['id'])
-        self.addCleanup(test_utils.call_and_ignore_notfound_exc,
-                        self.volumes_client.delete_volume, volume['id'])
+        # Volumes go before their type and whatever they were created from,
+        # as they used to when each one had its own cleanup.
+        parents = [('volume_type', volume_type['id'])]
+        if snapshot_id is not None:
+            parents.append(('snapshot', snapshot_id))
+        if source_volid is not None:
+            parents.append(('volume', source_volid))
+        self._track('volume', volume['id'], self.volumes_client.delete_volume,
+                    parents)
 
         # NOTE(e0ne): Cinder API v2 uses name instead of display_name
         if 'display_name' in volume:
             self.assertEqual(name, volume['display_name'])
         else:
             self.assertEqual(name, volume['name'])
-        waiters.wait_for_volume_status(self.volumes_client,
-                                       volume['id'], 'available')
-        # The volume retrieved on creation has a non-up-to-date status.
-        # Retrieval after it becomes active ensures correct details.
-        volume = self.volumes_client.show_volume(volume['id'])['volume']
-        vol_ref = hnas_backend.get_volume_reference(volume['id'])
-
-        return volume, vol_ref
+        return volume
 
     def unmanage_volume(self, hnas_vol_ref, vol):
         """Unmanages a volume and checks if it still lives in HNAS"""
 
         self.volumes_client.unmanage_volume(vol['id'])
-        self.volumes_client.wait_for_resource_deletion(vol['id'])
-        hnas_vol_ref.update_volume_path()
+        waiters.wait_for_resource_deletion(self.volumes_client, vol['id'])
+        hnas_vol_ref.update_volume_path(refresh=True)
         # Add cleanup via ssc in case the tests fails before the volume
         # gets remanaged and deleted.
-        self.addCleanup(hnas_vol_ref.rm_via_ssc)
+        self.schedule_rm_via_ssc(hnas_vol_ref)
         LOG.debug("Unmanaged vol path is: %s", hnas_vol_ref.unix_path)
 
     def unmanage_snapshot(self, hnas_snap_ref):
         """Unmanages a snapshot and checks if it still lives in HNAS"""
 
         self.manager.snapshots_v3_client.unmanage_snapshot(hnas_snap_ref.uuid)
-        self.manager.snapshots_v3_client.wait_for_resource_deletion(
-            hnas_snap_ref.uuid)
-        hnas_snap_ref.update_volume_path()
+        waiters.wait_for_resource_deletion(self.manager.snapshots_v3_client,
+                                           hnas_snap_ref.uuid)
+        hnas_snap_ref.update_volume_path(refresh=True)
         # Add cleanup via ssc in case the tests fails before the snap
         # gets remanaged and deleted.
-        self.addCleanup(hnas_snap_ref.rm_via_ssc)
+        self.schedule_rm_via_ssc(hnas_snap_ref)
         LOG.info("Unmanaged snap path is: %s.", hnas_snap_ref.unix_path)
 
+    def schedule_rm_via_ssc(self, hnas_vol_ref):
+        """Deletes a reference via ssc when the test is cleaned up.
+
+        All references scheduled during a test are deleted together, using
+        a single ssc round trip per backend. Scenario bodies run by
+        run_on_backends keep theirs apart, deleted along with the rest of
+        their cleanups.
+        """
+        scope = self._cleanup_scope
+        captured = getattr(scope, 'stack', None) is not None
+        refs = scope.ssc_rm_refs if captured else self._ssc_rm_refs
+        if refs is None:
+            refs = []
+            if captured:
+                scope.ssc_rm_refs = refs
+            else:
+                self._ssc_rm_refs = refs
+            self.addCleanup(self._rm_scheduled_refs_via_ssc, refs)
+        refs.append(hnas_vol_ref)
+
+    @staticmethod
+    def _rm_scheduled_refs_via_ssc(refs):
+        scheduled, refs[:] = list(refs), []
+        clients.HNASVolumeReference.rm_many_via_ssc(scheduled,
+                                                    raise_on_error=True)
+
     def manage_volume(self, hnas_backend, hnas_vol_ref, svc_idx=0):
         vol_name = data_utils.rand_name('managed-vol-')
         vol_nfs_path = hnas_vol_ref.get_nfs_url(svc_idx)
@@ -286,14 +861,12 @@ class BaseHNASTest(manager.ScenarioTest):
             name=vol_name,
             volume_type=cinder_vol_type)['volume']
         LOG.debug("Volume is to be remanaged with id %s", vol['id'])
+        hnas_backend.volume_index.invalidate(hnas_vol_ref.uuid)
         # If the manage call has been successful, we need to delete the
-        # new volume that will be registered with cinder. There will still
-        # be an old cleanup function for the unmanaged volume, but that'll
-        # ignore "not found exception" anyway.
-        self.addCleanup(self.volumes_client.wait_for_resource_deletion,
-                        vol['id'])
-        self.addCleanup(test_utils.call_and_ignore_notfound_exc,
-                        self.volumes_client.delete_volume, vol['id'])
+        # new volume that will be registered with cinder. The unmanaged
+        # volume is still tracked, but its deletion will ignore "not found
+        # exception" anyway.
+        self._track('volume', vol['id'], self.volumes_client.delete_volume)
 
         waiters.wait_for_volume_status(self.volumes_client,
                                        vol['id'], 'available')
@@ -313,16 +886,14 @@ class BaseHNASTest(manager.ScenarioTest):
             name=snap_name)
         snap = snap_resp['snapshot']
         LOG.debug("Snapshot is to be remanaged with id %s", snap['id'])
+        hnas_backend.volume_index.invalidate(hnas_snap_ref.uuid)
         # If the manage call has been successful, we need to delete the
-        # new snapshot  that will be registered with cinder. There will still
-        # be an old cleanup function for the unmanaged snapshot, but that'll
-        # ignore "not found exception" anyway.
-        self.addCleanup(
-            self.manager.snapshots_v3_client.wait_for_resource_deletion,
-            snap['id'])
-        self.addCleanup(test_utils.call_and_ignore_notfound_exc,
-                        self.manager.snapshots_v3_client.delete_snapshot,
-                        snap['id'])
+        # new snapshot  that will be registered with cinder. The unmanaged
+        # snapshot is still tracked, but its deletion will ignore "not
+        # found exception" anyway.
+        self._track('snapshot', snap['id'],
+                    self.manager.snapshots_v3_client.delete_snapshot,
+                    [('volume', parent_vol_id)])
 
         waiters.wait_for_snapshot_status(self.manager.snapshots_v3_client,
                                          snap['id'], 'available')
@@ -337,10 +908,9 @@ class BaseHNASTest(manager.ScenarioTest):
         snap = self.snapshots_client.create_snapshot(volume_id=vol_id,
                                                      force=True)['snapshot']
 
-        self.addCleanup(self.snapshots_client.wait_for_resource_deletion,
-                        snap['id'])
-        self.addCleanup(test_utils.call_and_ignore_notfound_exc,
-                        self.snapshots_client.delete_snapshot, snap['id'])
+        self._track('snapshot', snap['id'],
+                    self.snapshots_client.delete_snapshot,
+                    [('volume', vol_id)])
         LOG.info("Waiting for it to be ready...")
         waiters.wait_for_snapshot_status(self.snapshots_client,
                                          snap['id'], 'available')
@@ -375,27 +945,31 @@ class BaseHNASTest(manager.ScenarioTest):
         :param is_snapshot: switch between snapshot or volume deletion.
         """
         if is_snapshot:
-            del_func = self.snapshots_client.delete_snapshot
-            del_waiter = self.snapshots_client.wait_for_resource_deletion
+            client = self.snapshots_client
+            del_func = client.delete_snapshot
         else:
-            del_func = self.volumes_client.delete_volume
-            del_waiter = self.volumes_client.wait_for_resource_deletion
+            client = self.volumes_client
+            del_func = client.delete_volume
 
         test_utils.call_and_ignore_notfound_exc(del_func, hnas_vol_ref.uuid)
-        del_waiter(hnas_vol_ref.uuid)
+        waiters.wait_for_resource_deletion(client, hnas_vol_ref.uuid)
+        self._resource_tracker().discard(
+            'snapshot' if is_snapshot else 'volume', hnas_vol_ref.uuid)
+        hnas_vol_ref.hnas_backend.volume_index.invalidate(hnas_vol_ref.uuid)
         LOG.info("Deleted volume %s.", hnas_vol_ref.uuid)
 
-    def verify_volume_writable(self, ssh_client, vol_ref, test_string=None):
+    def verify_volume_writable(self, ssh_client, vol_ref, test_string=None,
+                               verify_mb=0):
         """Writes something to a volume and checks for matching data in HNAS.
 
-        :param instance: dict. An instance dictionary as returned by
-            self.create_instance_and_client or self.create_server.
         :param ssh_client: RemoteClient. An ssh client as returned by
             self.get_remote_client or self.create_instance_and_client.
         :param vol_ref: HNASVolumeReference. An object representing the volume
             residing in HNAS that is to be cloned.
         :param test_string: string. Some string that will be write in cinder
             volume as test.
+        :param verify_mb: int. If set, the first verify_mb MB of the volume
+            as seen by the instance are also compared with the file in HNAS.
         :returns: string. The string that was written into the volume.
         """
 
@@ -409,13 +983,54 @@ class BaseHNASTest(manager.ScenarioTest):
 
         LOG.debug("Checking if we have, within HNAS, the same thing we "
                   "have in the vm....")
-        s = vol_ref.get_first_bytes(len(test_string))
-        self.assertEqual(test_string, s,
-                         ('Data written to volume ("%s") from within the '
-                          'instance does not match data as read from HNAS '
-                          '("%s")' % (test_string, s)))
+        expected = hashlib.md5(test_string.encode('utf-8')).hexdigest()
+        digest = vol_ref.region_digests([(0, len(test_string))])[0]
+        if digest != expected:
+            s = vol_ref.get_first_bytes(len(test_string))
+            self.fail('Data written to volume ("%s") from within the '
+                      'instance does not match data as read from HNAS '
+                      '("%s")' % (test_string, s))
+
+        if verify_mb:
+            self.assert_regions_match(
+                blk_dev_tester, vol_ref,
+                regions.split_range(0, verify_mb * regions.MiB,
+                                    VERIFY_CHUNK_MB * regions.MiB))
         return test_string
 
+    def assert_regions_match(self, expected, actual, region_list):
+        """Fails unless both sides hold the same data in every region
+
+        :param expected: InstanceBlockDevTester or HNASVolumeReference.
+        :param actual: InstanceBlockDevTester or HNASVolumeReference.
+        :param region_list: list of (offset, length) tuples, in bytes.
+        """
+        mismatches = regions.compare_regions(expected, actual, region_list)
+        if mismatches:
+            self.fail("Data differs in %d region(s):\n%s" %
+                      (len(mismatches),
+                       regions.format_mismatches(mismatches)))
+
+    def assert_volumes_match(self, expected, actual, size_gb):
+        """Fails unless the first size_gb GB of both sides are identical
+
+        Both sides build a hash tree of their data (see merkle.py) and only
+        the nodes needed to find the differing chunks are compared, so this
+        is cheap enough for whole volumes.
+
+        :param expected: InstanceBlockDevTester or HNASVolumeReference.
+        :param actual: InstanceBlockDevTester or HNASVolumeReference.
+        :param size_gb: int. Amount of data to compare.
+        """
+        chunks = merkle.diff_chunks(expected, actual,
+                                    size_gb * 1024 * regions.MiB)
+        if chunks:
+            self.fail("%s and %s differ in %d chunk(s), starting at "
+                      "offsets (MB): %s" %
+                      (expected.data_path, actual.data_path, len(chunks),
+                       ", ".join(str(c.offset // regions.MiB)
+                                 for c in chunks[:20])))
+
     def upload_volume_to_image(self, vol):
         """Creates a Glance image from a volume.
 
@@ -429,9 +1044,7 @@ class BaseHNASTest(manager.ScenarioTest):
 
         image_id = body["image_id"]
 
-        self.addCleanup(test_utils.call_and_ignore_notfound_exc,
-                        self.image_client.delete_image,
-                        image_id)
+        self._track('image', image_id, self.image_client.delete_image)
 
         waiters.wait_for_image_status(self.image_client, image_id, 'active')
         waiters.wait_for_volume_status(self.volumes_client, vol['id'],
@@ -446,30 +1059,17 @@ class BaseHNASTest(manager.ScenarioTest):
 
     def retry(self, func, expect_success=True, num_retries=10, wait_secs=15,
               *params):
-        r = not expect_success
-        while True:
-            try:
-                r = func(*params)
-                if r and expect_success:
-                    return r
-                if not r and not expect_success:
-                    return r
-                LOG.debug(("(retry) <%s> returned <%s> but we expected "
-                           "a %s value"),
-                          func.__name__, r, expect_success)
-            except Exception as e:
-                if not expect_success:
-                    return False
-
-                LOG.debug("(retry) <%s> raised an exception.", func.__name__)
-                LOG.exception(e)
-            num_retries -= 1
-            LOG.debug("(retry) Retrying in %s sec (%s tries left)...",
-                      wait_secs, num_retries)
-            time.sleep(wait_secs)
-            if num_retries == 0:
-                LOG.debug("(retry) Giving up =================")
-                return r
+        """Calls func(*params) until it returns what is expected.
+
+        Gives up after num_retries * wait_secs seconds, polling right away
+        and then backing off up to wait_secs between calls. See
+        waiters.retry.
+
+        :returns: whatever func returned last.
+        """
+        return waiters.retry(func, params, expect_success=expect_success,
+                             timeout=num_retries * wait_secs,
+                             max_interval=wait_secs)
 
     def create_ssc_limit_tester(self, hnas_backend, connections=5):
         tester = clients.SSCLimitTester(hnas_backend, connections=connections)
@@ -0,0 +1,170 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_log import log as logging
+
+from tempest import config
+from tempest import test
+
+from cinder_hnas_plugin.tests.utils import clients
+from cinder_hnas_plugin.tests.utils import io_benchmark
+from cinder_hnas_plugin.tests.utils import op_latency
+from cinder_hnas_plugin.tests.utils import results
+from cinder_hnas_plugin.tests.scenario import base_hnas_test as base_hnas
+
+import testtools
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+
+@testtools.skipUnless(CONF.hnas.enabled_backends,
+                      ("Missing HNAS backend configuration in "
+                       "tempest config file."))
+@testtools.skipUnless(CONF.hnas.run_benchmarks,
+                      "Benchmarks are disabled, see [hnas] run_benchmarks.")
+class TestHNASBenchmark(base_hnas.BaseHNASTest):
+    @test.idempotent_id('e5ce2a83-baa8-449d-bdaa-0378a7b72d2f')
+    @test.services('compute', 'network', 'volume')
+    def test_hnas_guest_io(self):
+        """Measure guest I/O on volumes of every backend and pool
+
+        For every svc pool of every backend, and for an instance booted
+        from an image as well as one booted from a volume:
+        1. Create a volume V1 in the pool
+        2. Attach V1 to the instance
+        3. Run the configured workloads against V1 from within the instance
+        4. Detach V1
+        Results are saved as JSON in [hnas] results_dir.
+
+        Backends are measured one after the other, so that they do not
+        compete for the same compute node.
+        """
+        workloads = io_benchmark.workloads_from_conf()
+        size_mb = max(w.size_mb for w in workloads)
+        volume_size = max(CONF.volume.volume_size, -(-size_mb // 1024))
+        records = []
+
+        def scenario(backend, svc_idx):
+            for boot_from_volume in (False, True):
+                boot = 'volume' if boot_from_volume else 'image'
+                self.step("1 -> Creating a volume V1 in pool %s of %s.",
+                          backend.svc_pool_names[svc_idx], backend.name)
+                v1, v1_ref = self.create_volume(backend, size=volume_size,
+                                                idx_type=svc_idx)
+
+                self.step("2 -> Attaching V1 to an instance booted from "
+                          "%s.", boot)
+                instance, ssh_client = self.create_instance_and_client(
+                    create_backing_vol=boot_from_volume)
+                self.nova_volume_attach(instance, v1)
+
+                self.step("3 -> Running %d workloads.", len(workloads))
+                blk_dev_tester = clients.InstanceBlockDevTester(
+                    ssh_client, CONF.compute.volume_device_name)
+                benchmark = io_benchmark.GuestIOBenchmark(blk_dev_tester)
+                for result in benchmark.run_all(workloads):
+                    record = io_benchmark.result_to_dict(result)
+                    record.update(
+                        backend=backend.name,
+                        pool=backend.svc_pool_names[svc_idx],
+                        boot=boot)
+                    records.append(record)
+
+                self.step("4 -> Detaching V1.")
+                self.nova_volume_detach(instance, v1)
+
+        try:
+            self.run_on_backends(scenario, per_pool=True, max_workers=1)
+        finally:
+            if records:
+                results.write_json('guest-io', records)
+
+    @test.idempotent_id('66f6f411-1579-4d5b-ad01-fdb2aef543ad')
+    @test.services('volume')
+    def test_hnas_control_plane(self):
+        """Measure the latency of cinder operations on every pool
+
+        For every svc pool of every backend, [hnas] benchmark_iterations
+        times:
+        1. Create a volume V1
+        2. Clone V1 as C1
+        3. Create a snapshot S1 from V1
+        4. Create a volume V2 from S1
+        5. Extend C1
+        6. Unmanage C1 and manage it again
+        7. Delete V2, S1, C1 and V1
+        Each operation is timed until cinder accepts it and from then until
+        it completes. The distributions are logged as histograms and saved
+        as JSON in [hnas] results_dir.
+        """
+        recorder = op_latency.LatencyRecorder()
+
+        def scenario(backend, svc_idx):
+            pool = backend.svc_pool_names[svc_idx]
+
+            def measure(operation):
+                return recorder.measure(backend.name, pool, operation)
+
+            for iteration in range(CONF.hnas.benchmark_iterations):
+                LOG.debug("Iteration %d on %s/%s.", iteration + 1,
+                          backend.name, pool)
+                self.step("1 -> Creating a volume V1.")
+                with measure('create'):
+                    v1, v1_ref = self.create_volume(backend,
+                                                    idx_type=svc_idx)
+
+                self.step("2 -> Cloning V1 as C1.")
+                with measure('clone'):
+                    c1, c1_ref = self.create_volume(
+                        backend, source_volid=v1['id'], idx_type=svc_idx)
+
+                self.step("3 -> Creating a snapshot S1 from V1.")
+                with measure('snapshot'):
+                    s1, s1_ref = self.create_snapshot_from_volume(v1_ref)
+
+                self.step("4 -> Creating a volume V2 from S1.")
+                with measure('create_from_snapshot'):
+                    v2, v2_ref = self.create_volume(
+                        backend, snapshot_id=s1['id'], idx_type=svc_idx)
+
+                self.step("5 -> Extending C1.")
+                with measure('extend'):
+                    c1, c1_ref = self.extend_volume(c1_ref, c1['size'] + 1)
+
+                self.step("6 -> Unmanaging and managing C1.")
+                with measure('unmanage'):
+                    self.unmanage_volume(c1_ref, c1)
+                with measure('manage'):
+                    c1, c1_ref = self.manage_volume(backend, c1_ref,
+                                                    svc_idx)
+
+                self.step("7 -> Deleting V2, S1, C1 and V1.")
+                with measure('delete'):
+                    self.delete_volume(v2_ref)
+                with measure('delete_snapshot'):
+                    self.delete_snapshot(s1_ref)
+                for vol_ref in (c1_ref, v1_ref):
+                    with measure('delete'):
+                        self.delete_volume(vol_ref)
+
+        try:
+            self.run_on_backends(scenario, per_pool=True, max_workers=1)
+        finally:
+            report = recorder.report()
+            if report:
+                LOG.info("Control plane latencies:\n%s",
+                         recorder.format_report())
+                results.write_json('control-plane', report)
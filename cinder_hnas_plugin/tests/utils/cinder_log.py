@@ -0,0 +1,228 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""What cinder-volume was doing while a test waited.
+
+Lines of c-vol.log are grouped by request id into RequestTraces. The time
+between a line and the next line of the same request is charged to the
+category of the first one: the volume manager, the HNAS driver, or one of
+the driver's ssc calls, file clones, extends and manage operations. Request
+traces are then matched, through the volume and snapshot ids they mention,
+with the operations a test timeline recorded (an API call followed by a
+wait on the resource), giving for each operation:
+
+- queued: from the API call until cinder-volume starts working on the
+  request, i.e. the API, the scheduler and the message queue;
+- the time cinder-volume spent in each category;
+- the client observed duration.
+
+Log timestamps are in the local time of cinder-volume, which is assumed to
+share the clock of the tests (as in devstack).
+"""
+
+import collections
+import re
+import time
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+# lines worth subscribing to, see log_watch
+REQUEST_LINE_REGEX = re.compile(r'\[req-[0-9a-f-]+')
+
+_ANSI_REGEX = re.compile(r'\x1b\[[0-9;]*m')
+_LINE_REGEX = re.compile(
+    r'^(?P<date>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\.(?P<msecs>\d+) '
+    r'(?:\d+ )?(?P<level>[A-Z]+) (?P<logger>\S+) '
+    r'\[(?P<request_id>req-[0-9a-f-]+)[^\]]*\] (?P<message>.*)$')
+_UUID_REGEX = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+DRIVER_LOGGER = 'cinder.volume.drivers.hitachi'
+
+# categories of driver lines, the first one found in the message wins
+DRIVER_CATEGORIES = (('ssc', re.compile(r'\bssc\b', re.I)),
+                     ('clone', re.compile(r'clon', re.I)),
+                     ('extend', re.compile(r'extend', re.I)),
+                     ('manage', re.compile(r'manag', re.I)))
+
+LogEntry = collections.namedtuple(
+    'LogEntry', ['timestamp', 'level', 'logger', 'request_id', 'message'])
+
+
+def parse_line(text):
+    """Returns the LogEntry of a line of c-vol.log, None if it has none"""
+    match = _LINE_REGEX.match(_ANSI_REGEX.sub('', text))
+    if match is None:
+        return None
+    timestamp = time.mktime(time.strptime(match.group('date'),
+                                          '%Y-%m-%d %H:%M:%S'))
+    timestamp += float('0.' + match.group('msecs'))
+    return LogEntry(timestamp, match.group('level'), match.group('logger'),
+                    match.group('request_id'), match.group('message'))
+
+
+def categorize(entry):
+    if not entry.logger.startswith(DRIVER_LOGGER):
+        return 'manager'
+    for category, regex in DRIVER_CATEGORIES:
+        if regex.search(entry.message):
+            return category
+    return 'driver'
+
+
+class RequestTrace(object):
+    """The lines cinder-volume logged while serving a request"""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.entries = []
+        self.resource_ids = set()
+
+    def add(self, entry):
+        self.entries.append(entry)
+        self.resource_ids.update(_UUID_REGEX.findall(entry.message))
+
+    @property
+    def start(self):
+        return self.entries[0].timestamp
+
+    @property
+    def end(self):
+        return self.entries[-1].timestamp
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def breakdown(self):
+        """Returns {category: seconds} and {category: number of lines}"""
+        times = collections.defaultdict(float)
+        counts = collections.defaultdict(int)
+        for idx, entry in enumerate(self.entries):
+            category = categorize(entry)
+            counts[category] += 1
+            if idx + 1 < len(self.entries):
+                times[category] += (self.entries[idx + 1].timestamp -
+                                    entry.timestamp)
+        return dict(times), dict(counts)
+
+
+def parse_requests(lines):
+    """Groups lines of c-vol.log by request id
+
+    :param lines: iterable of strings.
+    :returns: list of RequestTrace, by time of their first line.
+    """
+    traces = collections.OrderedDict()
+    for text in lines:
+        entry = parse_line(text)
+        if entry is None:
+            continue
+        trace = traces.get(entry.request_id)
+        if trace is None:
+            trace = traces[entry.request_id] = RequestTrace(entry.request_id)
+        trace.add(entry)
+    return sorted(traces.values(), key=lambda t: t.start)
+
+
+ClientOperation = collections.namedtuple(
+    'ClientOperation', ['resource_id', 'name', 'start', 'end', 'api_time',
+                        'wait_time'])
+
+
+def client_operations(tl):
+    """Finds the operations recorded by a timeline.Timeline
+
+    An operation is a wait on a resource together with the API call made
+    right before it by the same span. Times are converted to wall clock.
+    """
+    def wall(t):
+        return tl.wall_start + (t - tl.root.start)
+
+    operations = []
+    for _, span in tl.root.walk():
+        last_api = None
+        for child in span.children:
+            if child.kind == 'api':
+                last_api = child
+                continue
+            if child.kind != 'wait' or child.end is None:
+                continue
+            ids = _UUID_REGEX.findall(child.name)
+            if not ids:
+                continue
+            begin = last_api if last_api is not None else child
+            operations.append(ClientOperation(
+                ids[0], '%s, %s' % (begin.name, child.name),
+                wall(begin.start), wall(child.end),
+                begin.duration if last_api is not None else 0.0,
+                child.duration))
+            last_api = None
+    return operations
+
+
+def correlate(operations, traces, slack=1.0):
+    """Matches client operations with the requests that served them
+
+    A request serves an operation if it mentions its resource and starts
+    within it (give or take slack seconds).
+
+    :returns: list of dicts, one per operation.
+    """
+    report = []
+    for op in operations:
+        matched = [t for t in traces
+                   if op.resource_id in t.resource_ids and
+                   op.start - slack <= t.start <= op.end + slack]
+        entry = {'resource': op.resource_id,
+                 'operation': op.name,
+                 'client_time': op.end - op.start,
+                 'api_time': op.api_time,
+                 'wait_time': op.wait_time,
+                 'requests': [t.request_id for t in matched]}
+        if matched:
+            times = collections.defaultdict(float)
+            counts = collections.defaultdict(int)
+            for trace in matched:
+                trace_times, trace_counts = trace.breakdown()
+                for category, seconds in trace_times.items():
+                    times[category] += seconds
+                for category, count in trace_counts.items():
+                    counts[category] += count
+            entry.update(
+                queued=max(min(t.start for t in matched) - op.start, 0.0),
+                volume_service=max(t.end for t in matched) -
+                min(t.start for t in matched),
+                backend_time=dict(times),
+                backend_lines=dict(counts))
+        report.append(entry)
+    return report
+
+
+def format_report(report):
+    lines = []
+    for entry in report:
+        if 'backend_time' not in entry:
+            lines.append('%7.2fs %s: not seen by cinder-volume' % (
+                entry['client_time'], entry['operation'][:70]))
+            continue
+        detail = ' '.join('%s %.2fs' % item for item in
+                          sorted(entry['backend_time'].items()))
+        lines.append('%7.2fs %s: queued %.2fs, cinder-volume %.2fs (%s)' % (
+            entry['client_time'], entry['operation'][:70], entry['queued'],
+            entry['volume_service'], detail))
+    return '\n'.join(lines)
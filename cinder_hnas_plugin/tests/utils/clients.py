@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import os
 from oslo_config import cfg
 import re
@@ -20,10 +21,20 @@ from tempest import config
 from tempest.lib import exceptions as lib_exc
 import threading
 import time
+import uuid
 
 import logging
 
+from cinder_hnas_plugin.tests.utils import evs_catalog
+from cinder_hnas_plugin.tests.utils import log_watch
+from cinder_hnas_plugin.tests.utils import patterns
+from cinder_hnas_plugin.tests.utils import regions
 from cinder_hnas_plugin.tests.utils import remote_client
+from cinder_hnas_plugin.tests.utils import ssc_governor
+from cinder_hnas_plugin.tests.utils import ssc_table
+from cinder_hnas_plugin.tests.utils import ssh_pool
+from cinder_hnas_plugin.tests.utils import ssh_profiler
+from cinder_hnas_plugin.tests.utils import topology
 
 LOG = logging.getLogger(__name__)
 
@@ -75,6 +86,171 @@ hnas_drivers_common_opts = [
 ]
 CONF = config.CONF
 
+# backend sections of tempest.conf whose options are already registered
+_registered_backend_groups = set()
+
+
+VolumePath = collections.namedtuple('VolumePath',
+                                    ['unix_path', 'fs_name', 'ssc_path'])
+
+
+class VolumePathIndex(object):
+    """Maps volume and snapshot UUIDs to their backing files in HNAS.
+
+    Looking a volume up with a find over /mnt/lb walks every EVS and
+    filesystem, which takes seconds once there are thousands of files. The
+    index instead scans the fs-by-name trees once, then only rescans the
+    export directories it already knows about when a UUID is missing. A last
+    resort find over the whole tree is only used if that fails as well.
+
+    The finds run without holding the index lock, which only guards merging
+    their output, so lookups from several threads do not queue behind each
+    other's ssh round trips. A missing UUID is rescanned at most every
+    RESCAN_INTERVAL seconds, and the whole tree searched for it at most every
+    TREE_RESCAN_INTERVAL seconds, however often it is polled for.
+
+    Entries must be invalidated explicitly whenever the driver renames or
+    removes a file (manage, unmanage, delete).
+    """
+
+    SCAN_ROOT = "/mnt/lb/*/fs-by-name"
+    UUID_REGEX = re.compile(r'([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                            r'[0-9a-f]{4}-[0-9a-f]{12})$')
+    RESCAN_INTERVAL = 5
+    TREE_RESCAN_INTERVAL = 60
+
+    def __init__(self, hnas_client):
+        self.client = hnas_client
+        self._lock = threading.Lock()
+        # held by the thread running the first scan, which the others wait
+        # for instead of scanning as well
+        self._scan_lock = threading.Lock()
+        self._paths = {}
+        self._export_dirs = set()
+        self._scanned = False
+        # bumped by invalidate: what scans that started earlier found about
+        # the invalidated UUIDs (or about anything, after a full
+        # invalidation) may be stale
+        self._generation = 0
+        self._cleared_at = 0
+        self._invalidated_at = {}
+        # uuid -> (time of the last rescan, of the last whole tree search)
+        self._misses = {}
+
+    @staticmethod
+    def make_entry(unix_path):
+        fs_name = unix_path.split('fs-by-name/')[1].split('/')[0]
+        ssc_path = unix_path.split(fs_name)[1]
+        return VolumePath(unix_path, fs_name, ssc_path)
+
+    def lookup(self, uuid):
+        """Returns the VolumePath of a UUID or None if there is no such file"""
+        self._ensure_scanned()
+        with self._lock:
+            if uuid in self._paths:
+                return self._paths[uuid]
+        self._rescan(uuid)
+        with self._lock:
+            return self._paths.get(uuid)
+
+    def invalidate(self, uuid=None):
+        """Forgets a single UUID, or everything if uuid is None."""
+        with self._lock:
+            self._generation += 1
+            if uuid is None:
+                self._paths.clear()
+                self._export_dirs.clear()
+                self._misses.clear()
+                self._invalidated_at.clear()
+                self._cleared_at = self._generation
+                self._scanned = False
+            else:
+                self._paths.pop(uuid, None)
+                self._misses.pop(uuid, None)
+                self._invalidated_at[uuid] = self._generation
+
+    def rename(self, uuid, new_unix_path):
+        with self._lock:
+            self._paths[uuid] = self.make_entry(new_unix_path)
+
+    def export_dirs(self):
+        self._ensure_scanned()
+        with self._lock:
+            return sorted(self._export_dirs)
+
+    def _find(self, paths, pattern, **kwargs):
+        """Runs a find, returning its output or None if it failed"""
+        try:
+            return self.client.permissive_find(paths, pattern, **kwargs)
+        except lib_exc.SSHExecCommandFailed:
+            LOG.debug("Could not find %s in %s.", pattern, paths)
+            return None
+
+    def _merge(self, find_output, generation):
+        """Adds the files of a find to the index, with the lock held
+
+        :param generation: int. The generation of the index when the find
+            started.
+        :returns: Boolean. False if the whole index was invalidated since the
+            find started, in which case its output is dropped.
+        """
+        if generation < self._cleared_at:
+            return False
+        for path in (find_output or '').split('\n'):
+            path = path.strip()
+            if 'fs-by-name' not in path:
+                continue
+            match = self.UUID_REGEX.search(path)
+            if match is None:
+                continue
+            self._export_dirs.add(os.path.dirname(path))
+            if self._invalidated_at.get(match.group(1), -1) > generation:
+                continue
+            # as with a plain find, the first file found for an id wins
+            if match.group(1) not in self._paths:
+                self._paths[match.group(1)] = self.make_entry(path)
+        return True
+
+    def _ensure_scanned(self):
+        with self._lock:
+            if self._scanned:
+                return
+        with self._scan_lock:
+            with self._lock:
+                if self._scanned:
+                    return
+                generation = self._generation
+            start = time.time()
+            output = self._find(self.SCAN_ROOT, "*-*-*-*-*")
+            with self._lock:
+                self._scanned = self._merge(output, generation)
+                LOG.debug("Indexed %d HNAS files in %.2f s.",
+                          len(self._paths), time.time() - start)
+
+    def _rescan(self, uuid):
+        pattern = "*%s" % uuid
+        now = time.time()
+        with self._lock:
+            last_rescan, last_tree = self._misses.get(uuid, (0, 0))
+            if now - last_rescan < self.RESCAN_INTERVAL:
+                return
+            search_tree = now - last_tree >= self.TREE_RESCAN_INTERVAL
+            self._misses[uuid] = (now, now if search_tree else last_tree)
+            export_dirs = sorted(self._export_dirs)
+            generation = self._generation
+
+        if export_dirs:
+            output = self._find(" ".join(export_dirs), pattern, maxdepth=1)
+            with self._lock:
+                if not self._merge(output, generation) or \
+                        uuid in self._paths:
+                    return
+
+        if search_tree:
+            output = self._find(self.SCAN_ROOT, pattern)
+            with self._lock:
+                self._merge(output, generation)
+
 
 class HNASVolumeReference(object):
     """A reference to a volume file residing in HNAS
@@ -97,6 +273,35 @@ class HNASVolumeReference(object):
         self.hnas_backend.ssc_rm(self.evs_idx, self.fs_name, self.ssc_path,
                                  force=True)
 
+    @staticmethod
+    def rm_many_via_ssc(vol_refs, raise_on_error=False):
+        """Deletes several references using one ssc round trip per backend.
+
+        :param vol_refs: list of HNASVolumeReference, possibly spread across
+            several backends.
+        :param raise_on_error: Boolean. Whether to raise an exception, once
+            every backend was tried, if any reference could not be deleted.
+        :returns: list of SSCResult, as returned by
+            HNASCinderBackend.ssc_rm_many.
+        """
+        by_backend = collections.OrderedDict()
+        for ref in vol_refs:
+            by_backend.setdefault(ref.hnas_backend, []).append(
+                (ref.evs_idx, ref.fs_name, ref.ssc_path))
+
+        results = []
+        for backend, targets in by_backend.items():
+            LOG.info("Deleting %d references in HNAS via ssc...",
+                     len(targets))
+            results.extend(backend.ssc_rm_many(targets, force=True))
+
+        errors = [r for r in results if r.failed]
+        if errors and raise_on_error:
+            raise Exception("Could not delete %d of %d references via ssc: "
+                            "%s" % (len(errors), len(results),
+                                    [e.command for e in errors]))
+        return results
+
     def get_nfs_url(self, svc_idx):
         """Returns a url that can be used to manage this volume
 
@@ -124,13 +329,38 @@ class HNASVolumeReference(object):
         remanaged, then you should get a new volume reference to it
         """
         fname = self.unix_path.split('/')[-1]
-        self.unix_path = self.unix_path[: -len(fname)] + 'unmanage-' + fname
+        new_path = self.unix_path[: -len(fname)] + 'unmanage-' + fname
+        self.hnas_backend.volume_index.rename(self.uuid, new_path)
+        self.unix_path, self.fs_name, self.ssc_path = (
+            VolumePathIndex.make_entry(new_path))
 
     def get_first_bytes(self, num_bytes):
-        return self.hnas_backend.exec_command(
-            ("dd if=%(vol_path)s bs=1 count=%(num_bytes)d" %
-             {"vol_path": self.unix_path, "num_bytes": num_bytes}),
-            sudo=True)
+        return self.read_region(0, num_bytes)
+
+    @property
+    def data_path(self):
+        return self.unix_path
+
+    def run_as_root(self, script):
+        """Runs a shell script, free of single quotes, as root in HNAS"""
+        return self.hnas_backend.exec_command("sh -c '%s'" % script,
+                                              sudo=True)
+
+    def read_region(self, offset, length):
+        """Returns length bytes of the volume file, starting at offset"""
+        return self.run_as_root(
+            regions.read_command(self.unix_path, offset, length))
+
+    def region_digests(self, region_list):
+        """Returns the md5 of each (offset, length) range of the volume file
+
+        Every range is hashed within HNAS in a single ssh command, see
+        regions.compare_regions.
+        """
+        region_list = regions.as_regions(region_list)
+        out = self.run_as_root(
+            regions.digest_command(self.unix_path, region_list))
+        return regions.parse_digests(out, region_list)
 
     def exists(self):
         return self.hnas_backend.exec_command("ls %s" % self.unix_path)
@@ -140,28 +370,115 @@ class HNASVolumeReference(object):
             'ls -l %s | cut -d " " -f 5' % self.unix_path))
         return size / (1024 ** 3)
 
-    def update_volume_path(self):
-        paths = self.hnas_backend.permissive_find("/mnt/lb",
-                                                  "*%s" % self.uuid)
+    def update_volume_path(self, refresh=False):
+        """Looks up the file backing this reference in the backend's index
+
+        :param refresh: Boolean. Whether to drop whatever the index knows
+            about this reference first, e.g. because the driver has just
+            renamed its file.
+        """
+        index = self.hnas_backend.volume_index
+        if refresh:
+            index.invalidate(self.uuid)
         self.unix_path = None
         self.ssc_path = None
         self.fs_name = None
-        for path in paths.split('\n'):
-            if 'fs-by-name' in path:
-                if self.unix_path is not None:
-                    raise Exception(("Found two volumes with the same id: "
-                                     "%s and %s" % (path, self.unix_path)))
-                self.unix_path = path
-                self.fs_name = path.split('fs-by-name/')[1].split('/')[0]
-                self.ssc_path = self.unix_path.split(self.fs_name)[1]
-                break
-        else:
+        entry = index.lookup(self.uuid)
+        if entry is None:
             raise Exception("Something went wrong while searching for volume "
                             "%s" % self.uuid)
+        self.unix_path, self.fs_name, self.ssc_path = entry
+
+
+class SSCResult(collections.namedtuple('SSCResult',
+                                       ['command', 'output', 'exit_status'])):
+    """The outcome of a single command run as part of an SSCBatch"""
+
+    @property
+    def failed(self):
+        return self.exit_status != 0
+
+
+class SSCBatch(object):
+    """Runs several ssc commands in a single supervisor session.
+
+    Every HNASClient.ssc call pays for its own ssh exec, sudo and su. A batch
+    queues commands and sends them all at once, one ssc call after the other
+    inside the same su shell, each followed by a sentinel line carrying its
+    exit status. The output is then split back into one SSCResult per
+    command. Since the commands run sequentially, a batch never holds more
+    than one of the few SSC sessions HNAS allows at a time.
+
+    Batches are created with HNASClient.ssc_batch.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def add(self, command):
+        """Queues a command, returning its index in the results list."""
+        self.commands.append(command)
+        return len(self.commands) - 1
+
+    def __len__(self):
+        return len(self.commands)
+
+    def execute(self, raise_on_error=False):
+        """Runs the queued commands and demultiplexes their output.
+
+        :param raise_on_error: Boolean. Whether to raise an exception if any
+            of the commands failed.
+        :returns: list of SSCResult, in the same order the commands were
+            added.
+        """
+        if not self.commands:
+            return []
+
+        sentinel = '__ssc_batch_%s__' % uuid.uuid4().hex
+        script = []
+        for idx, command in enumerate(self.commands):
+            script.append(
+                'ssc -u supervisor localhost "%s" 2>&1; '
+                'echo "%s %d $?"' % (command, sentinel, idx))
+        with self.client.ssc_governor.session():
+            output = self.client.exec_command(
+                "su supervisor -c '%s'" % "; ".join(script), sudo=True)
+
+        results = []
+        begin = 0
+        marker = re.compile(r'%s (\d+) (\d+)' % sentinel)
+        for match in marker.finditer(output):
+            idx = int(match.group(1))
+            results.append(SSCResult(self.commands[idx],
+                                     output[begin:match.start()].strip('\n'),
+                                     int(match.group(2))))
+            begin = match.end()
+
+        if len(results) != len(self.commands):
+            raise Exception("Expected output for %d ssc commands, got %d: %s"
+                            % (len(self.commands), len(results), output))
+
+        errors = [r for r in results if r.failed]
+        for error in errors:
+            LOG.debug("ssc command <%s> failed with status %d: %s",
+                      error.command, error.exit_status, error.output)
+        if errors and raise_on_error:
+            raise Exception("%d of %d ssc commands failed: %s" %
+                            (len(errors), len(results),
+                             [e.command for e in errors]))
+        return results
 
 
 class HNASClient(remote_client.RemoteClient):
-    """An ssh client with some specific HNAS methods"""
+    """An ssh client with some specific HNAS methods
+
+    HNAS clients are created over and over again (one per backend on every
+    test), so they lease their connections from a process-wide pool instead
+    of paying a full ssh handshake for each command.
+    """
+
+    ssh_client_class = ssh_pool.PooledSSHClient
 
     def __init__(self,
                  ip_address,
@@ -172,6 +489,7 @@ class HNASClient(remote_client.RemoteClient):
                  servers_client=None):
         self.ip_address = ip_address
         self.password = password
+        ssh_profiler.register_secret(password)
         super(HNASClient, self).__init__(ip_address, username, password, pkey,
                                          server, servers_client)
 
@@ -181,136 +499,54 @@ class HNASClient(remote_client.RemoteClient):
                        (self.password, command))
         return super(HNASClient, self).exec_command(command)
 
-    def permissive_find(self, path, pattern):
+    def permissive_find(self, path, pattern, maxdepth=None):
         """find command that does not fail if stdout is not empty
 
         Runs a find command that ignores non zero return codes as long as
         there is something in the stdout
         """
+        depth = "-maxdepth %d " % maxdepth if maxdepth is not None else ""
         try:
-            sout = self.exec_command("find %s -name '%s'" % (path, pattern))
+            sout = self.exec_command("find %s %s-name '%s'" %
+                                     (path, depth, pattern))
         except lib_exc.SSHExecCommandFailed as ex:
             sout = re.split('\nstdout:\n', ex._error_string)[1]
             if len(sout) == 0 or sout.isspace():
                 raise ex
         return sout
 
-    def ssc(self, command):
+    @property
+    def ssc_governor(self):
+        return ssc_governor.get_governor(self.ip_address)
+
+    def ssc(self, command, governed=True):
+        """Runs an ssc command on HNAS
+
+        :param governed: Boolean. Whether to wait for a free SSC session
+            first (see ssc_governor). Only tests that exhaust the sessions
+            on purpose should skip it.
+        """
         fullcmd = "su supervisor -c 'ssc -u supervisor localhost \"%s\"'"
         fullcmd = fullcmd % command
-        output = self.exec_command(fullcmd, sudo=True)
+        if not governed:
+            return self.exec_command(fullcmd, sudo=True)
+        with self.ssc_governor.session():
+            output = self.exec_command(fullcmd, sudo=True)
         return output
 
-    def get_evs_by_ip(self, ips):
-        all_evs = self.evs_list()
-        evs_list = []
-        for ip in ips:
-            for evs in all_evs:
-                if evs['IP Address'] == ip:
-                    break
-                if evs['IP Address'].__class__ == list:
-                    for evs_ip in evs['IP Address']:
-                        if ip == evs_ip:
-                            break
-                    else:
-                        continue
-                    break
-            else:
-                raise Exception("Could not find evs with ip %s" % ip)
-            evs['host_path'] = ""
-            evs_list.append(evs)
-        return evs_list
+    def ssc_batch(self):
+        """Returns an SSCBatch that runs its commands through this client"""
+        return SSCBatch(self)
 
-    def evs_list(self):
-        return self._table_to_list_of_dicts(self.ssc("evs list"))
-
-    def _table_to_list_of_dicts(self, text):
-        lines = text.split('\n')
-        for line_idx in range(len(lines)):
-            line = lines[line_idx]
-            # if line entirely composed of dashes and space
-            if ((re.search("^[- ]+$", line) is not None) and
-                    (not line.isspace())):
-                separator_line = line
-                column_names_line = lines[line_idx - 1]
-                data_line_begin_idx = line_idx + 1
-                break
+    def ssc_table(self, command):
+        """Runs an ssc command printing a table, yielding its TableRows"""
+        return ssc_table.iter_rows(self.ssc(command))
 
-        # Create a regex based on the line composed of dashes. The number of
-        # dashes is the maximum number of characters that can appear in each
-        # field. The objective of this code is to go from a separator line
-        # like this:
-        # --- ------- ----- ------
-        # to a regex like this:
-        # (...) (.......) (.....) (......)
-        # which will capture, from the lines of data, columns that fit into
-        # the parenthesis
-        line_parser_regex = ""
-        for c in separator_line:
-            if c == '-':
-                # if beginning a new group of dashes
-                if (len(line_parser_regex) == 0 or
-                        line_parser_regex[-1] not in ['.', '(']):
-                    line_parser_regex += '('
-
-                line_parser_regex += '.'
-            else:
-                # ending group of dashes
-                if len(line_parser_regex) and line_parser_regex[-1] == '.':
-                    line_parser_regex += ')'
-                line_parser_regex += c
-        if line_parser_regex[-1] == '-':
-            line_parser_regex += ')'
-
-        def separate_columns(parser_regex, line_text):
-            """Parses a line of text from a table and wraps it into an array
-
-            Parses a line of text from a table emitted by hnas commands
-            such as evs-list, retrieving the contents of each column and
-            appending each one of them to an array.
-
-            :param parser_regex: A string representing a regex like so:
-                                 (...) (.....) (...) (....)
-            :param line_text: The line of text that is to be parsed using the
-                               regex passed in parser_regex
-            :returns: An array representing the elements of the line being
-                      parsed.
-            """
-            raw_columns = re.search(parser_regex, line_text).groups()
-            return [c.strip() for c in raw_columns]
-
-        col_names = separate_columns(line_parser_regex, column_names_line)
-
-        table_data = []  # a list of dictionaries
-        for data_line in lines[data_line_begin_idx:]:
-            if len(data_line) == 0 or data_line.isspace():
-                continue
+    def evs_list(self):
+        return list(self.ssc_table("evs list"))
 
-            ordered_data = separate_columns(line_parser_regex, data_line)
-            # if this is a continuation line, ...
-            if len(ordered_data[0]) == 0:
-                # ... then we'll append data to the last line
-                d = table_data[-1]
-                for d_idx in range(len(ordered_data)):
-                    key = col_names[d_idx]
-                    data = ordered_data[d_idx]
-                    if len(data) == 0:
-                        continue
-
-                    if not d[key]:
-                        d[key] = data
-                        continue
-
-                    if d[key].__class__ != list:
-                        d[key] = [d[key]]
-                    d[key].append(ordered_data[d_idx])
-            else:
-                d = {}
-                for d_idx in range(len(ordered_data)):
-                    key = col_names[d_idx]
-                    d[key] = ordered_data[d_idx]
-                table_data.append(d)
-        return table_data
+    def filesystem_list(self):
+        return list(self.ssc_table("filesystem-list"))
 
     def get_pids(self, pr_name):
         # Get pid(s) of a process/program
@@ -340,6 +576,50 @@ class InstanceBlockDevTester(object):
         out = self.ssh_client.exec_command(" && ".join(commands))
         return out
 
+    def fill_with_data(self, size_mb, str_to_append=""):
+        """Fills the device using the mode set in CONF.hnas.fill_mode"""
+        if CONF.hnas.fill_mode == 'pattern':
+            return self.fill_with_pattern(size_mb,
+                                          str_to_append=str_to_append)
+        return self.fill_with_random_data(size_mb, str_to_append)
+
+    def fill_with_pattern(self, size_mb, seed=None, block_size_kb=None,
+                          str_to_append=""):
+        """Fills the device with reproducible data, see patterns.py
+
+        :param seed: string. Determines the data, a new one is drawn if None.
+        :param block_size_kb: int. Size of the pattern blocks, must divide
+            1024. Defaults to CONF.hnas.fill_block_size_kb.
+        :returns: FillResult. Whatever is needed to check the data later,
+            see patterns.find_mismatches.
+        """
+        if seed is None:
+            seed = patterns.new_seed()
+        if block_size_kb is None:
+            block_size_kb = CONF.hnas.fill_block_size_kb
+        block_size = block_size_kb * 1024
+        if regions.MiB % block_size:
+            raise ValueError("block_size_kb must divide 1024")
+
+        commands = [patterns.write_command(self.dev_path, seed,
+                                           size_mb * regions.MiB,
+                                           block_size)]
+        if str_to_append:
+            commands.append(
+                "echo \"%(str_to_append)s\" | "
+                "dd of=%(dev_path)s bs=1M seek=%(seek_mb)d" %
+                {'str_to_append': str_to_append, 'dev_path': self.dev_path,
+                 'seek_mb': size_mb})
+        commands.append("sync")
+
+        start = time.time()
+        self.run_as_root(" && ".join(commands))
+        elapsed = time.time() - start
+        LOG.info("Wrote %d MB of pattern %s to %s in %.1f s (%.1f MB/s).",
+                 size_mb, seed, self.dev_path, elapsed,
+                 size_mb / elapsed if elapsed else 0)
+        return patterns.FillResult(seed, block_size, size_mb, elapsed)
+
     def fill_with_random_data(self, size_mb, str_to_append=""):
         commands = []
         commands.append(
@@ -355,12 +635,27 @@ class InstanceBlockDevTester(object):
         return out
 
     def get_bytes_at_offset(self, offset_mb, num_bytes):
-        out_str = self.ssh_client.exec_command(
-            "sudo dd if=%(dev_path)s bs=1 skip=%(skip_bytes)d "
-            "count=%(num_bytes)d" %
-            {"dev_path": self.dev_path, 'skip_bytes': 1024 * 1024 * offset_mb,
-             "num_bytes": num_bytes})
-        return out_str
+        return self.read_region(regions.MiB * offset_mb, num_bytes)
+
+    @property
+    def data_path(self):
+        return self.dev_path
+
+    def run_as_root(self, script):
+        """Runs a shell script, free of single quotes, as root in the VM"""
+        return self.ssh_client.exec_command("sudo sh -c '%s'" % script)
+
+    def read_region(self, offset, length):
+        """Returns length bytes of the block device, starting at offset"""
+        return self.run_as_root(
+            regions.read_command(self.dev_path, offset, length))
+
+    def region_digests(self, region_list):
+        """Returns the md5 of each (offset, length) range of the device"""
+        region_list = regions.as_regions(region_list)
+        out = self.run_as_root(
+            regions.digest_command(self.dev_path, region_list))
+        return regions.parse_digests(out, region_list)
 
 
 class HNASCinderBackend(HNASClient):
@@ -394,14 +689,59 @@ class HNASCinderBackend(HNASClient):
         self.volume_backend_name = volume_backend_name
         super(HNASCinderBackend, self).__init__(hnas_ip, hnas_tester_user,
                                                 hnas_tester_password)
-        self.evs_dict = self.get_evs_by_ip(self.evs_ips)
-        self.evs_idx = []
-        for evs in self.evs_dict:
-            self.evs_idx.append(evs['EVS ID'])
+        self.volume_index = VolumePathIndex(self)
+        # svc_hdp holds the EVS IPs, so changing them in tempest.conf
+        # changes the key
+        topology_key = topology.config_key(name, hnas_ip, hnas_tester_user,
+                                           svc_hdp)
+        cache = topology.get_cache()
+        self.evs_catalog = evs_catalog.EVSCatalog.from_client(
+            self, cache.get_evs_list(topology_key, self))
+        if not self.evs_catalog.has_ips(self.evs_ips):
+            # The probe only sees EVSes come and go, not their IPs
+            # changing, so the cached layout may be stale
+            LOG.info("EVS IPs of %s not in its cached layout, rediscovering "
+                     "it.", name)
+            cache.invalidate(topology_key)
+            self.evs_catalog = evs_catalog.EVSCatalog.from_client(
+                self, cache.get_evs_list(topology_key, self))
+        self.evs_dict = self.evs_catalog.get_by_ips(self.evs_ips)
+        self.evs_idx = [evs.id for evs in self.evs_dict]
 
     def get_volume_reference(self, uuid, svc_idx=0):
         return HNASVolumeReference(self, uuid, self.evs_idx[svc_idx])
 
+    def export_index(self, unix_path):
+        """Returns the index of the svc export holding a file
+
+        The volume index covers the whole HNAS, so backends sharing one see
+        each other's files. A file belongs to this backend only if it lies
+        right under one of its export directories, in a filesystem of the
+        EVS serving that export.
+
+        :returns: int, or None if the file is not in any export of this
+            backend.
+        """
+        if 'fs-by-name/' not in unix_path:
+            return None
+        fs_name = VolumePathIndex.make_entry(unix_path).fs_name
+        directory = os.path.dirname(unix_path)
+        for svc_idx, export in enumerate(self.export_path):
+            if not directory.endswith(
+                    '/fs-by-name/%s/%s' % (fs_name, export.strip('/'))):
+                continue
+            try:
+                filesystems = self.evs_catalog.filesystems(
+                    self.evs_idx[svc_idx])
+            except Exception as e:
+                LOG.debug("Could not list the filesystems of %s: %s",
+                          self.name, e)
+                filesystems = ()
+            if filesystems and fs_name not in filesystems:
+                continue
+            return svc_idx
+        return None
+
     # def get_fs_name_from_dir(self, dirname):
     #    self.permissive_find()
 
@@ -417,6 +757,27 @@ class HNASCinderBackend(HNASClient):
         commands.append("rm %s %s" % (force_flag, path))
         return self.ssc(" && ".join(commands))
 
+    def ssc_rm_many(self, targets, force=True, raise_on_error=False):
+        """Removes several files using a single ssc round trip.
+
+        Each file is removed by an ssc command of its own, so that a file
+        that can not be removed does not keep the others from being
+        removed, but all of them are sent in the same batch.
+
+        :param targets: iterable of (evs_num, fs_name, path) tuples.
+        :param force: Boolean. Whether to pass -f to rm.
+        :param raise_on_error: Boolean. Whether to raise an exception if any
+            of the files could not be removed.
+        :returns: list of SSCResult, one per file.
+        """
+        force_flag = '-f' if force else ''
+        batch = self.ssc_batch()
+        for evs_num, fs_name, path in targets:
+            batch.add(" && ".join(
+                [self.get_ssc_file_cmd_prefix(evs_num, fs_name),
+                 "rm %s %s" % (force_flag, path)]))
+        return batch.execute(raise_on_error=raise_on_error)
+
     def ls_iscsi_volume(self, evs_num, fs_name, volume_id):
         commands = []
         commands.append(self.get_ssc_file_cmd_prefix(evs_num, fs_name))
@@ -439,7 +800,9 @@ class HNASCinderBackend(HNASClient):
         """
         backends = []
         for bname in CONF.hnas.enabled_backends:
-            CONF.register_opts(hnas_drivers_common_opts, bname)
+            if bname not in _registered_backend_groups:
+                CONF.register_opts(hnas_drivers_common_opts, bname)
+                _registered_backend_groups.add(bname)
             backend = getattr(CONF, bname)
 
             svcs_pool = [backend.hnas_svc0_pool_name,
@@ -481,8 +844,14 @@ class SSCLimitTester(object):
         self.backend = hnas_backend
         self.pid_list = []
         self.error_has_occurred = False
+        self._hold = None
 
     def open_connections(self):
+        # NOTE: no other ssc call of this process may run while the
+        # sessions are exhausted, or it would fail for the wrong reason.
+        LOG.debug("Waiting for the other ssc calls to %s to finish...",
+                  self.backend.ip_address)
+        self._hold = self.backend.ssc_governor.exclusive()
         num_retries = 10
         wait_secs = 1
         ssc_command = "sleep 60"
@@ -513,64 +882,66 @@ class SSCLimitTester(object):
         full_command = ('\'ssc -u supervisor localhost "%s"\'' % ssc_command)
         self.pid_list = self.backend.get_pids(pr_name=full_command)
 
-    def close_connections_on_error(self):
+    def close_connections_on_error(self, timeout=5):
         """Starts a thread to wait for errors and to close connections.
 
         Starts a thread to wait for error on cinder log. If the error shows up
         on the log file, the connections are closed.
+
+        :param timeout: A time in seconds to stop waiting if the error does
+            not show up.
         """
-        thread = threading.Thread(target=self._run_close_connections_on_error)
+        subscription = self._watch_cinder_log(
+            'Failed to establish SSC connection')
+        thread = threading.Thread(target=self._run_close_connections_on_error,
+                                  args=(subscription, timeout))
         thread.start()
 
-    def _run_close_connections_on_error(self):
-        self._wait_for_cinder_log('Failed to establish SSC connection')
-
-        if self.error_has_occurred:
+    def _run_close_connections_on_error(self, subscription, timeout):
+        if self._wait_for_cinder_log(subscription, timeout):
             self.close_connections()
 
-    def _wait_for_cinder_log(self, expected_str, start_pos=None, timeout=5):
-        """Waits for errors on cinder log.
+    def _watch_cinder_log(self, expected_str, start_pos=None):
+        """Starts to look for a message on cinder log.
 
         :param expected_str: A message to be found on log file.
-        :param start_pos: A file position to start reading the log file.
-        :param timeout: A time in seconds to leave the function if the
-            expected_str is not found.
-        :return: None
+        :param start_pos: A position of the log watcher to start looking
+            from, by default the lines yet to be written.
+        :return: A log_watch.Subscription.
         """
-        LOG.debug("Reading cinder log file...")
+        return log_watch.get_watcher().subscribe(re.escape(expected_str),
+                                                 once=True, since=start_pos)
 
-        with open('/home/ubuntu/devstack_logs/c-vol.log', 'r') as f:
-            if not start_pos:
-                f.seek(0, 2)
-            else:
-                f.seek(start_pos)
-            start_time = time.time()
-            while True:
-                where = f.tell()
-                line = f.readline()
-                if not line:
-                    time.sleep(1)
-                    f.seek(where)
-                elif expected_str in line:
-                    LOG.debug(line)
-                    self.error_has_occurred = True
-                    return
+    def _wait_for_cinder_log(self, subscription, timeout=5):
+        """Waits for the message of a subscription to show up on cinder log.
 
-                if time.time() - timeout > start_time:
-                    LOG.debug("Reading cinder log timed out.")
-                    return
+        :return: Boolean. Whether it did.
+        """
+        LOG.debug("Reading cinder log file...")
+        line = subscription.wait(timeout)
+        subscription.cancel()
+        if line is None:
+            LOG.debug("Reading cinder log timed out.")
+            return False
+        LOG.debug(line.text)
+        self.error_has_occurred = True
+        return True
 
     def close_connections(self):
         LOG.debug("Closing connections...")
-        for pid in self.pid_list:
-            if pid:
-                try:
-                    self.backend.send_signal(pid=pid, signum=15)
-                except lib_exc.SSHExecCommandFailed as e:
-                    if 'No such process' in str(e):
-                        LOG.debug("Connection already closed.")
-                    else:
-                        raise
+        try:
+            for pid in self.pid_list:
+                if pid:
+                    try:
+                        self.backend.send_signal(pid=pid, signum=15)
+                    except lib_exc.SSHExecCommandFailed as e:
+                        if 'No such process' in str(e):
+                            LOG.debug("Connection already closed.")
+                        else:
+                            raise
+        finally:
+            if self._hold is not None:
+                self._hold.release()
 
 
 class SSCThread(threading.Thread):
@@ -583,7 +954,7 @@ class SSCThread(threading.Thread):
 
     def run(self):
         try:
-            result = self.backend.ssc(self.command)
+            result = self.backend.ssc(self.command, governed=False)
             LOG.debug("Thread %s result: %s", (self.name, result))
         except lib_exc.SSHExecCommandFailed as e:
             LOG.debug("%s - %s", (self.name, str(e)))
@@ -0,0 +1,67 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+import threading
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+def run_concurrently(func, args_list, max_workers=None, name='worker'):
+    """Calls func once for each tuple of arguments on a bounded thread pool.
+
+    :param func: callable. The function to be called.
+    :param args_list: list of tuples. The positional arguments of each call.
+    :param max_workers: int. Maximum number of calls running at the same
+        time. Defaults to one thread per call.
+    :param name: string. Prefix of the worker thread names, shown in logs.
+    :returns: list of tuples <result, exc_info>, in the same order as
+        args_list. exc_info is None if the call succeeded, otherwise result
+        is None and exc_info is what sys.exc_info() returned in the worker.
+    """
+    args_list = list(args_list)
+    results = [None] * len(args_list)
+    if not args_list:
+        return results
+
+    if max_workers is None or max_workers > len(args_list):
+        max_workers = len(args_list)
+    max_workers = max(max_workers, 1)
+
+    lock = threading.Lock()
+    next_idx = [0]
+
+    def _worker():
+        while True:
+            with lock:
+                idx = next_idx[0]
+                if idx >= len(args_list):
+                    return
+                next_idx[0] += 1
+            try:
+                results[idx] = (func(*args_list[idx]), None)
+            except BaseException:
+                results[idx] = (None, sys.exc_info())
+
+    threads = [threading.Thread(target=_worker, name='%s-%d' % (name, i))
+               for i in range(max_workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -0,0 +1,134 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+EVSRecord = collections.namedtuple(
+    'EVSRecord', ['id', 'type', 'label', 'ips', 'fields'])
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _as_tuple(value):
+    if not value:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return (value,)
+
+
+def evs_record(row):
+    """Returns the EVSRecord of a row of 'evs list'
+
+    fields holds every column of the row as (name, value) pairs.
+    """
+    return EVSRecord(id=row['EVS ID'],
+                     type=row.get('Type'),
+                     label=row.get('Label'),
+                     ips=_as_tuple(row.get('IP Address')),
+                     fields=tuple((k, _freeze(v)) for k, v in row.items()))
+
+
+class EVSCatalog(object):
+    """The EVSes of an HNAS, indexed by id and by IP address.
+
+    Built once from the rows of 'evs list'. Records are immutable and can be
+    shared by every backend on the same HNAS. The filesystems of each EVS
+    are only listed (with 'filesystem-list') the first time they are asked
+    for.
+    """
+
+    # columns of 'filesystem-list'
+    FS_NAME_COLUMN = 'Instance name'
+    FS_EVS_COLUMN = 'EVS'
+
+    def __init__(self, evs_rows, list_filesystems=None):
+        """:param evs_rows: iterable of mappings. Rows of 'evs list'.
+        :param list_filesystems: callable. Returns the rows of
+            'filesystem-list', used by filesystems.
+        """
+        self._by_id = collections.OrderedDict()
+        self._by_ip = {}
+        for row in evs_rows:
+            record = evs_record(row)
+            self._by_id[record.id] = record
+            for ip in record.ips:
+                if ip in self._by_ip:
+                    LOG.warning("IP %s belongs to EVS %s and %s.", ip,
+                                self._by_ip[ip].id, record.id)
+                    continue
+                self._by_ip[ip] = record
+        self._list_filesystems = list_filesystems
+        self._filesystems = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_client(cls, hnas_client, evs_rows=None):
+        """Builds the catalog of the HNAS behind hnas_client
+
+        :param evs_rows: rows of 'evs list', if already known.
+        """
+        if evs_rows is None:
+            evs_rows = hnas_client.evs_list()
+        return cls(evs_rows, hnas_client.filesystem_list)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def get_by_id(self, evs_id):
+        try:
+            return self._by_id[evs_id]
+        except KeyError:
+            raise Exception("Could not find evs %s" % evs_id)
+
+    def get_by_ip(self, ip):
+        try:
+            return self._by_ip[ip]
+        except KeyError:
+            raise Exception("Could not find evs with ip %s" % ip)
+
+    def has_ips(self, ips):
+        """Returns whether every IP in ips belongs to some EVS"""
+        return all(ip in self._by_ip for ip in ips)
+
+    def get_by_ips(self, ips):
+        return [self.get_by_ip(ip) for ip in ips]
+
+    def filesystems(self, evs_id):
+        """Returns the names of the filesystems of an EVS, as a tuple"""
+        with self._lock:
+            if self._filesystems is None:
+                if self._list_filesystems is None:
+                    raise Exception("No way to list the filesystems of the "
+                                    "EVSes")
+                by_evs = collections.defaultdict(list)
+                for row in self._list_filesystems():
+                    by_evs[row[self.FS_EVS_COLUMN]].append(
+                        row[self.FS_NAME_COLUMN])
+                self._filesystems = dict(
+                    (k, tuple(v)) for k, v in by_evs.items())
+        return self._filesystems.get(evs_id, ())
@@ -0,0 +1,214 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+import time
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+InstanceSpec = collections.namedtuple(
+    'InstanceSpec', ['create_backing_vol', 'volume_size', 'source_uuid',
+                     'source_type', 'delete_vol_on_termination', 'flavor'])
+
+
+class PooledInstance(object):
+    """An instance booted by an InstancePool
+
+    :param instance: dict. The server, as returned by show_server.
+    :param ssh_client: RemoteClient. An ssh connection to the server.
+    :param cleanups: list of tuples <function, args, kwargs>. What must be
+        called, in reverse order, to get rid of the server and everything
+        created along with it (keypair, security group, floating ip...).
+    """
+
+    def __init__(self, spec, instance, ssh_client, cleanups, boot_time):
+        self.spec = spec
+        self.instance = instance
+        self.ssh_client = ssh_client
+        self.cleanups = cleanups
+        self.boot_time = boot_time
+        self.discarded = False
+
+    @property
+    def id(self):
+        return self.instance['id']
+
+
+class InstancePool(object):
+    """Keeps booted, ssh-ready instances around to be leased by tests.
+
+    Booting a server, waiting for it to become ACTIVE and for ssh to come
+    up is the slowest part of most scenarios. The pool keeps up to size
+    idle instances for every boot spec it has been asked for and hands them
+    out instead. Returned instances are scrubbed (extra volumes detached)
+    and reused, and a background thread boots replacements for the leased
+    ones.
+
+    :param boot: callable. Receives an InstanceSpec and returns a tuple
+        <instance, ssh_client, cleanups> as described in PooledInstance.
+    :param scrub: callable. Receives a PooledInstance being returned and
+        brings it back to its pristine state. Returns False if the instance
+        can not be reused.
+    :param size: int. Number of idle instances to keep for each spec.
+    """
+
+    def __init__(self, boot, scrub, size):
+        self._boot_func = boot
+        self._scrub_func = scrub
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = collections.defaultdict(list)
+        self._pending = collections.defaultdict(int)
+        self._refill_queue = collections.deque()
+        self._refill_event = threading.Event()
+        self._stopping = False
+        self.lease_times = []
+        self.boot_times = []
+        self._refiller = threading.Thread(target=self._refill_loop,
+                                          name='instance-pool-refill')
+        self._refiller.daemon = True
+        self._refiller.start()
+
+    def _boot(self, spec):
+        start = time.time()
+        instance, ssh_client, cleanups = self._boot_func(spec)
+        boot_time = time.time() - start
+        with self._lock:
+            self.boot_times.append(boot_time)
+        return PooledInstance(spec, instance, ssh_client, cleanups, boot_time)
+
+    @staticmethod
+    def _destroy(pooled):
+        LOG.debug("Destroying pooled instance %s.", pooled.id)
+        for function, args, kwargs in reversed(pooled.cleanups):
+            try:
+                function(*args, **kwargs)
+            except Exception:
+                LOG.exception("Failed to clean up pooled instance %s.",
+                              pooled.id)
+        pooled.cleanups = []
+
+    def lease(self, spec):
+        """Returns a PooledInstance matching spec, booting one if needed."""
+        start = time.time()
+        pooled = None
+        while pooled is None:
+            with self._lock:
+                idle = self._idle[spec]
+                candidate = idle.pop() if idle else None
+            if candidate is None:
+                pooled = self._boot(spec)
+                break
+            try:
+                candidate.ssh_client.validate_authentication()
+                pooled = candidate
+            except Exception:
+                LOG.warning("Pooled instance %s is unreachable, discarding "
+                            "it.", candidate.id)
+                self._destroy(candidate)
+
+        lease_time = time.time() - start
+        with self._lock:
+            self.lease_times.append(lease_time)
+            avg_boot = (sum(self.boot_times) / len(self.boot_times)
+                        if self.boot_times else 0)
+        LOG.info("Leased instance %s in %.2f s (a cold boot takes %.2f s on "
+                 "average).", pooled.id, lease_time, avg_boot)
+        self._schedule_refill(spec)
+        return pooled
+
+    def release(self, pooled):
+        """Takes back a leased instance, reusing it if possible."""
+        if pooled.discarded:
+            return
+        try:
+            reusable = self._scrub_func(pooled)
+        except Exception:
+            LOG.exception("Failed to scrub pooled instance %s.", pooled.id)
+            reusable = False
+
+        with self._lock:
+            keep = (reusable and not self._stopping and
+                    len(self._idle[pooled.spec]) < self.size)
+            if keep:
+                self._idle[pooled.spec].append(pooled)
+        if not keep:
+            self._destroy(pooled)
+
+    def discard(self, pooled):
+        """Destroys a leased instance that must not be returned to the pool"""
+        pooled.discarded = True
+        self._destroy(pooled)
+
+    def _schedule_refill(self, spec):
+        with self._lock:
+            missing = (self.size - len(self._idle[spec]) -
+                       self._pending[spec])
+            for _ in range(missing):
+                self._pending[spec] += 1
+                self._refill_queue.append(spec)
+        self._refill_event.set()
+
+    def _refill_loop(self):
+        while True:
+            self._refill_event.wait()
+            with self._lock:
+                if self._stopping:
+                    return
+                if not self._refill_queue:
+                    self._refill_event.clear()
+                    continue
+                spec = self._refill_queue.popleft()
+
+            pooled = None
+            try:
+                pooled = self._boot(spec)
+            except Exception:
+                LOG.exception("Failed to boot an instance for the pool.")
+
+            with self._lock:
+                self._pending[spec] -= 1
+                keep = pooled is not None and not self._stopping
+                if keep:
+                    self._idle[spec].append(pooled)
+            if pooled is not None and not keep:
+                self._destroy(pooled)
+
+    def shutdown(self):
+        """Stops refilling and destroys every idle instance."""
+        with self._lock:
+            self._stopping = True
+            self._refill_event.set()
+        self._refiller.join()
+
+        with self._lock:
+            idle = [p for pool in self._idle.values() for p in pool]
+            self._idle.clear()
+        for pooled in idle:
+            self._destroy(pooled)
+        LOG.info("Instance pool stats: %s", self.stats())
+
+    def stats(self):
+        def _avg(values):
+            return sum(values) / len(values) if values else None
+
+        with self._lock:
+            return {'leases': len(self.lease_times),
+                    'avg_lease_time': _avg(self.lease_times),
+                    'boots': len(self.boot_times),
+                    'avg_boot_time': _avg(self.boot_times)}
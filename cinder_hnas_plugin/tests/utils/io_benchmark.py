@@ -0,0 +1,320 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""I/O workloads run inside an instance against an attached volume.
+
+fio is used when the guest has it. Otherwise a small python script is
+copied to the guest, and as a last resort (e.g. cirros) plain dd is timed
+from here, in which case there are no latency percentiles and queue depth
+is ignored.
+
+Reads must reach the volume rather than the page cache of the guest, which
+run_all has just filled. Every result tells how that was ensured (see
+IOResult.cache): 'direct' I/O, page cache 'dropped' right before the
+workload, or neither ('buffered'), in which case read numbers are not
+worth comparing.
+"""
+
+import base64
+import collections
+import itertools
+import json
+import time
+
+import logging
+
+from tempest import config
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+READ_PATTERNS = ('read', 'randread')
+PATTERNS = READ_PATTERNS + ('write', 'randwrite')
+
+# Random workloads run by dd spawn a process per operation, so they stop
+# after this many operations
+DD_MAX_RANDOM_OPS = 2048
+
+
+class Workload(collections.namedtuple(
+        'Workload', ['rw', 'block_size_kb', 'queue_depth', 'size_mb'])):
+
+    @property
+    def name(self):
+        return '%s-%dk-qd%d' % (self.rw, self.block_size_kb,
+                                self.queue_depth)
+
+    @property
+    def is_read(self):
+        return self.rw in READ_PATTERNS
+
+
+IOResult = collections.namedtuple(
+    'IOResult', ['workload', 'tool', 'mbps', 'iops', 'p50_ms', 'p95_ms',
+                 'p99_ms', 'cache'])
+
+DROP_CACHES_COMMAND = "sync; echo 3 > /proc/sys/vm/drop_caches"
+
+
+def result_to_dict(result):
+    d = result._asdict()
+    d['workload'] = dict(result.workload._asdict(),
+                         name=result.workload.name)
+    return d
+
+
+def workloads_from_conf(size_mb=None):
+    """Returns every combination of the configured benchmark parameters"""
+    if size_mb is None:
+        size_mb = CONF.hnas.benchmark_size_mb
+    for rw in CONF.hnas.benchmark_workloads:
+        if rw not in PATTERNS:
+            raise ValueError("Unknown benchmark workload %s" % rw)
+    return [Workload(rw, int(bs), int(qd), size_mb) for rw, bs, qd in
+            itertools.product(CONF.hnas.benchmark_workloads,
+                              CONF.hnas.benchmark_block_sizes_kb,
+                              CONF.hnas.benchmark_queue_depths)]
+
+
+# Run by the guest's python (2 or 3): <path> <rw> <bs> <size> <qd>.
+# Prints a JSON object with the elapsed time, the number of operations, the
+# latency percentiles in ms and whether O_DIRECT was used.
+_GUEST_SCRIPT = b'''
+import json, mmap, os, random, sys, threading, time
+path, rw = sys.argv[1], sys.argv[2]
+bs, size, qd = int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5])
+blocks = size // bs
+write = rw in ('write', 'randwrite')
+rand = rw.startswith('rand')
+direct = hasattr(os, 'readv') and hasattr(os, 'O_DIRECT')
+lock = threading.Lock()
+state = {'next': 0, 'lat': []}
+def worker():
+    flags = os.O_RDWR if write else os.O_RDONLY
+    if direct:
+        flags |= os.O_DIRECT
+    fd = os.open(path, flags)
+    buf = mmap.mmap(-1, bs)
+    buf.write(b'h' * bs)
+    lat = []
+    while True:
+        with lock:
+            i = state['next']
+            state['next'] += 1
+        if i >= blocks:
+            break
+        off = (random.randrange(blocks) if rand else i) * bs
+        t = time.time()
+        os.lseek(fd, off, 0)
+        if write:
+            os.write(fd, buf)
+        elif direct:
+            os.readv(fd, [buf])
+        else:
+            os.read(fd, bs)
+        lat.append(time.time() - t)
+    if write:
+        os.fsync(fd)
+    os.close(fd)
+    with lock:
+        state['lat'].extend(lat)
+threads = [threading.Thread(target=worker) for _ in range(qd)]
+start = time.time()
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+elapsed = time.time() - start
+lat = sorted(state['lat'])
+def pct(p):
+    return lat[min(int(p / 100.0 * len(lat)), len(lat) - 1)] * 1000
+print(json.dumps({'elapsed': elapsed, 'ops': len(lat), 'p50': pct(50),
+                  'p95': pct(95), 'p99': pct(99), 'direct': direct}))
+'''
+
+_GUEST_SCRIPT_PATH = '/tmp/hnas_io_benchmark.py'
+
+
+class GuestIOBenchmark(object):
+    """Runs workloads against the device of an InstanceBlockDevTester"""
+
+    def __init__(self, blk_dev_tester):
+        self.tester = blk_dev_tester
+        self.ssh_client = blk_dev_tester.ssh_client
+        self._tool = None
+        self._python = None
+        self._dd_direct = None
+
+    def detect_tool(self):
+        if self._tool is None:
+            found = self.ssh_client.exec_command(
+                "which fio python3 python 2>/dev/null || true").split()
+            names = [f.rsplit('/', 1)[-1] for f in found]
+            if 'fio' in names:
+                self._tool = 'fio'
+            elif 'python3' in names or 'python' in names:
+                self._tool = 'python'
+                self._python = 'python3' if 'python3' in names else 'python'
+                self.ssh_client.exec_command(
+                    "echo %s | base64 -d > %s" %
+                    (base64.b64encode(_GUEST_SCRIPT).decode('ascii'),
+                     _GUEST_SCRIPT_PATH))
+            else:
+                self._tool = 'dd'
+            LOG.info("Guest I/O benchmark will use %s.", self._tool)
+        return self._tool
+
+    def run_all(self, workloads):
+        """Runs workloads, writing the whole range first if any reads it
+
+        Reading never written parts of a volume would only measure how
+        fast HNAS returns the holes of a sparse file. Read workloads run
+        before every write workload, as these overwrite the pattern (dd
+        with zeros, which HNAS may store as holes again).
+
+        :returns: list<IOResult>. In the order of workloads.
+        """
+        if any(w.is_read for w in workloads):
+            self.tester.fill_with_pattern(max(w.size_mb for w in workloads))
+        results = [None] * len(workloads)
+        for i in sorted(range(len(workloads)),
+                        key=lambda i: not workloads[i].is_read):
+            results[i] = self.run(workloads[i])
+        return results
+
+    def run(self, workload):
+        tool = self.detect_tool()
+        LOG.debug("Running workload %s with %s.", workload.name, tool)
+        result = getattr(self, '_run_%s' % tool)(workload)
+        LOG.info("%s: %.1f MB/s, %.0f IOPS, p99 %s ms (%s)", workload.name,
+                 result.mbps, result.iops, result.p99_ms, result.cache)
+        if workload.is_read and result.cache == 'buffered':
+            LOG.warning("%s read through the page cache of the guest, its "
+                        "numbers do not reflect the volume.", workload.name)
+        return result
+
+    def _drop_caches(self):
+        """Returns whether the page cache of the guest could be dropped"""
+        try:
+            self.tester.run_as_root(DROP_CACHES_COMMAND)
+            return True
+        except Exception as e:
+            LOG.debug("Could not drop the page cache of the guest: %s", e)
+            return False
+
+    def _supports_dd_direct(self):
+        """Whether the guest's dd knows iflag=direct (busybox may not)"""
+        if self._dd_direct is None:
+            try:
+                self.tester.run_as_root(
+                    "dd if=%s of=/dev/null bs=4096 count=1 iflag=direct" %
+                    self.tester.dev_path)
+                self._dd_direct = True
+            except Exception:
+                self._dd_direct = False
+            LOG.debug("Guest dd %s direct I/O.",
+                      "supports" if self._dd_direct else "does not support")
+        return self._dd_direct
+
+    def _run_fio(self, workload):
+        out = self.tester.run_as_root(
+            "fio --name=hnas --filename=%(dev)s --rw=%(rw)s --bs=%(bs)dk "
+            "--iodepth=%(qd)d --size=%(size)dm --ioengine=libaio --direct=1 "
+            "--output-format=json" %
+            {'dev': self.tester.dev_path, 'rw': workload.rw,
+             'bs': workload.block_size_kb, 'qd': workload.queue_depth,
+             'size': workload.size_mb})
+        job = json.loads(out[out.index('{'):])['jobs'][0]
+        stats = job['read' if workload.is_read else 'write']
+
+        # fio 3 reports completion latencies in ns, older ones in us
+        if 'clat_ns' in stats:
+            pcts, scale = stats['clat_ns'].get('percentile', {}), 1e6
+        else:
+            pcts, scale = stats.get('clat', {}).get('percentile', {}), 1e3
+
+        def _pct(point):
+            value = pcts.get('%.6f' % point)
+            return value / scale if value is not None else None
+
+        return IOResult(workload, 'fio', stats['bw'] / 1024.0, stats['iops'],
+                        _pct(50), _pct(95), _pct(99), 'direct')
+
+    def _run_python(self, workload):
+        # O_DIRECT needs os.readv (python 3) to read into an aligned buffer,
+        # which only the script knows whether it has
+        dropped = workload.is_read and self._drop_caches()
+        out = self.tester.run_as_root(
+            "%s %s %s %s %d %d %d" %
+            (self._python, _GUEST_SCRIPT_PATH, self.tester.dev_path,
+             workload.rw, workload.block_size_kb * 1024,
+             workload.size_mb * 1024 * 1024, workload.queue_depth))
+        data = json.loads(out[out.index('{'):])
+        elapsed = data['elapsed'] or 1e-9
+        iops = data['ops'] / elapsed
+        if data.get('direct'):
+            cache = 'direct'
+        else:
+            cache = 'dropped' if dropped else 'buffered'
+        return IOResult(workload, 'python',
+                        iops * workload.block_size_kb / 1024.0, iops,
+                        data['p50'], data['p95'], data['p99'], cache)
+
+    def _run_dd(self, workload):
+        bs = workload.block_size_kb * 1024
+        blocks = workload.size_mb * 1024 * 1024 // bs
+        dev = self.tester.dev_path
+        direct = self._supports_dd_direct()
+        iflag = " iflag=direct" if direct else ""
+        oflag = " oflag=direct" if direct else ""
+        if workload.rw == 'read':
+            ops = blocks
+            cmd = "dd if=%s of=/dev/null bs=%d count=%d%s" % (
+                dev, bs, ops, iflag)
+        elif workload.rw == 'write':
+            ops = blocks
+            cmd = "dd if=/dev/zero of=%s bs=%d count=%d%s && sync" % (
+                dev, bs, ops, oflag)
+        else:
+            ops = min(blocks, DD_MAX_RANDOM_OPS)
+            if workload.rw == 'randread':
+                dd = "dd if=%s of=/dev/null bs=%d count=1 skip=$o%s" % (
+                    dev, bs, iflag)
+            else:
+                dd = ("dd if=/dev/zero of=%s bs=%d count=1 seek=$o "
+                      "conv=notrunc%s" % (dev, bs, oflag))
+            cmd = ("i=0; while [ $i -lt %(ops)d ]; do "
+                   "o=$(((RANDOM * 32768 + RANDOM) %% %(blocks)d)); "
+                   "%(dd)s 2>/dev/null; i=$((i+1)); done; sync" %
+                   {'ops': ops, 'blocks': blocks, 'dd': dd})
+
+        if direct:
+            cache = 'direct'
+        elif workload.is_read and self._drop_caches():
+            cache = 'dropped'
+        else:
+            cache = 'buffered'
+
+        # Timed from here, so take the cost of the round trip out
+        start = time.time()
+        self.tester.run_as_root("true")
+        overhead = time.time() - start
+        start = time.time()
+        self.tester.run_as_root(cmd)
+        elapsed = max(time.time() - start - overhead, 1e-9)
+
+        iops = ops / elapsed
+        return IOResult(workload, 'dd', iops * bs / (1024.0 * 1024), iops,
+                        None, None, None, cache)
@@ -0,0 +1,389 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Following log files as they grow.
+
+A LogWatcher tails one file in a background thread and hands every new line
+to the subscriptions whose pattern it matches. There is one watcher per
+file in the process, however many tests subscribe to it. The thread is
+woken up by inotify when it is available, and polls the file otherwise.
+Rotated and truncated files are followed.
+
+Every line is tagged with a position, the number of bytes the watcher has
+read so far. A test can save the position and later subscribe from it,
+receiving the lines it would have missed (as long as they are still among
+the last backlog_size lines). A test can also wait, with sync, for the
+watcher to read whatever the file holds at that moment.
+"""
+
+import atexit
+import collections
+import ctypes
+import ctypes.util
+import errno
+import os
+import re
+import select
+import struct
+import threading
+import time
+
+import logging
+
+from tempest import config
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+LogLine = collections.namedtuple('LogLine', ['position', 'text', 'match'])
+
+# inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_EVENT = struct.Struct('iIII')
+
+
+class _Inotify(object):
+    """Wakes up on changes to files, through inotify on their directories
+
+    :param paths: iterable of strings. E.g. a symlink and the file it
+        points to, whose writes are reported under the name of the latter.
+    """
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (_IN_MODIFY | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE |
+                _IN_DELETE)
+        self.names = set()
+        directories = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            self.names.add(os.path.basename(path).encode('utf-8'))
+            directories.add(os.path.dirname(path) or '/')
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, directory.encode('utf-8'),
+                                        mask)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(err,
+                              "inotify_add_watch failed on %s" % directory)
+
+    def wait(self, timeout):
+        """Returns whether one of the files changed within timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return False
+            raise
+        offset = 0
+        changed = False
+        while offset + _IN_EVENT.size <= len(data):
+            _, _, _, length = _IN_EVENT.unpack_from(data, offset)
+            offset += _IN_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name in self.names:
+                changed = True
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Poller(object):
+
+    def __init__(self, interval):
+        self.interval = interval
+
+    def wait(self, timeout):
+        time.sleep(min(self.interval, timeout))
+        return True
+
+    def close(self):
+        pass
+
+
+class Subscription(object):
+    """Lines of a watched file matching a pattern
+
+    Works as a future of the first matching line (see wait), and keeps
+    every matching line in lines.
+    """
+
+    def __init__(self, watcher, pattern, callback=None, once=False):
+        self.watcher = watcher
+        self.pattern = pattern
+        self.callback = callback
+        self.once = once
+        self.lines = []
+        self._event = threading.Event()
+
+    def _deliver(self, position, text):
+        match = self.pattern.search(text)
+        if match is None:
+            return False
+        line = LogLine(position, text, match)
+        self.lines.append(line)
+        self._event.set()
+        if self.callback is not None:
+            try:
+                self.callback(line)
+            except Exception:
+                LOG.exception("Log subscription callback failed")
+        return self.once
+
+    def wait(self, timeout=None):
+        """Returns the first matching LogLine, or None after timeout"""
+        self._event.wait(timeout)
+        return self.lines[0] if self.lines else None
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self.watcher.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cancel()
+
+
+class LogWatcher(object):
+    """Tails a file, from its end when the watcher starts"""
+
+    def __init__(self, path, poll_interval=0.1, backlog_size=10000):
+        self.path = path
+        self.poll_interval = poll_interval
+        # reentrant, callbacks run with it held and may subscribe
+        self._lock = threading.RLock()
+        self._read_up = threading.Condition(self._lock)
+        self._subscriptions = []
+        self._backlog = collections.deque(maxlen=backlog_size)
+        self._position = 0
+        self._partial = b''
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._stop = threading.Event()
+        self._open(at_end=True)
+        self._real_path = None
+        self._waker = None
+        self._watch()
+        self._thread = threading.Thread(target=self._run,
+                                        name='log-watch-%s' %
+                                        os.path.basename(path))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _watch(self):
+        """(Re)creates the waker, watching the file the path resolves to
+
+        devstack logs are often symlinks to timestamped files, and writes
+        are reported under the name of the file, not of the symlink.
+        """
+        real_path = os.path.realpath(self.path)
+        if self._waker is not None:
+            if real_path == self._real_path:
+                return
+            self._waker.close()
+        self._real_path = real_path
+        try:
+            self._waker = _Inotify(set([self.path, real_path]))
+        except (OSError, AttributeError) as e:
+            LOG.debug("Polling %s, inotify is not available: %s", self.path,
+                      e)
+            self._waker = _Poller(self.poll_interval)
+
+    def position(self):
+        """Returns the position of the last line read"""
+        with self._lock:
+            return self._position
+
+    def sync(self, timeout=5):
+        """Waits until the watcher has read the file up to its current end
+
+        Lines written before the call are then delivered to subscriptions,
+        except for a last one still lacking its newline.
+
+        :param timeout: int. Seconds to wait at most.
+        :returns: Boolean. Whether the watcher caught up within timeout.
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return True
+        deadline = time.time() + timeout
+        with self._read_up:
+            while not self._has_read(st):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._read_up.wait(min(remaining, self.poll_interval))
+        return True
+
+    def _has_read(self, st):
+        if self._inode == st.st_ino:
+            return self._offset >= st.st_size
+        # Rotated after the stat, if the path now points to the file being
+        # read, as the old one is read up to its end before switching.
+        try:
+            return os.stat(self.path).st_ino == self._inode
+        except OSError:
+            return False
+
+    def subscribe(self, pattern, callback=None, once=False, since=None):
+        """Delivers the lines matching pattern from now on
+
+        :param pattern: string or compiled regex, searched in every line.
+        :param callback: callable. Called with every matching LogLine, from
+            the watcher thread, so it should not take long.
+        :param once: Boolean. Whether to stop after the first match.
+        :param since: int. A position from position(). Lines read after it
+            are delivered first.
+        :returns: Subscription.
+        """
+        if not hasattr(pattern, 'search'):
+            pattern = re.compile(pattern)
+        subscription = Subscription(self, pattern, callback, once)
+        with self._lock:
+            done = False
+            if since is not None:
+                for position, text in self._backlog:
+                    if position > since and \
+                            subscription._deliver(position, text):
+                        done = True
+                        break
+            if not done:
+                self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(5)
+        self._waker.close()
+        if self._file is not None:
+            self._file.close()
+
+    def _open(self, at_end=False):
+        try:
+            f = open(self.path, 'rb')
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                LOG.warning("Cannot read %s: %s", self.path, e)
+            return
+        if self._file is not None:
+            self._file.close()
+        if at_end:
+            f.seek(0, os.SEEK_END)
+        with self._lock:
+            self._file = f
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._offset = f.tell()
+        self._partial = b''
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._follow()
+                self._waker.wait(1.0)
+            except Exception:
+                LOG.exception("Error watching %s", self.path)
+                time.sleep(self.poll_interval)
+
+    def _follow(self):
+        """Reads whatever was appended, following rotations"""
+        if self._file is None:
+            self._open()
+            if self._file is None:
+                return
+            self._watch()
+        self._read()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if st.st_ino != self._inode:
+            LOG.debug("%s was rotated.", self.path)
+            self._open()
+            self._watch()
+            self._read()
+        elif st.st_size < self._file.tell():
+            LOG.debug("%s was truncated.", self.path)
+            self._file.seek(0)
+            self._partial = b''
+            self._read()
+
+    def _read(self):
+        data = self._file.read()
+        lines = []
+        if data:
+            data = self._partial + data
+            lines = data.split(b'\n')
+            self._partial = lines.pop()
+        with self._lock:
+            for raw in lines:
+                self._position += len(raw) + 1
+                text = raw.decode('utf-8', 'replace')
+                self._backlog.append((self._position, text))
+                for subscription in list(self._subscriptions):
+                    if subscription._deliver(self._position, text):
+                        self._subscriptions.remove(subscription)
+            self._offset = self._file.tell()
+            self._read_up.notify_all()
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(path=None):
+    """Returns the process-wide watcher of path, [hnas] cinder_volume_log
+    by default
+    """
+    path = path or CONF.hnas.cinder_volume_log
+    with _watchers_lock:
+        watcher = _watchers.get(path)
+        if watcher is None:
+            watcher = _watchers[path] = LogWatcher(path)
+        return watcher
+
+
+def _close_watchers():
+    for watcher in list(_watchers.values()):
+        watcher.close()
+
+
+atexit.register(_close_watchers)
@@ -0,0 +1,139 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Whole-volume comparisons through hash trees built remotely.
+
+Each side (an InstanceBlockDevTester or an HNASVolumeReference) hashes its
+data in fixed size chunks and then hashes groups of fanout digests, level
+after level, up to a single root, all of it in a temporary directory of
+the host that holds the data. Comparing two sides starts from the roots
+and only fetches the children of nodes that differ, so finding the chunks
+that differ between two 10GB volumes moves a few kilobytes over ssh.
+"""
+
+import logging
+
+from cinder_hnas_plugin.tests.utils import regions
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_MB = 4
+DEFAULT_FANOUT = 16
+
+# Hashes the chunks into level 0, then every group of fanout lines of a
+# level into a line of the next one, until a level has a single line.
+# Prints the working directory, the index of the top level and the root.
+# Written for busybox sh, and without single quotes so it can be wrapped
+# in sh -c '...'.
+_BUILD_SCRIPT = (
+    'd=$(mktemp -d) && c=0 && '
+    'while [ $c -lt %(chunks)d ]; do '
+    'dd if=%(path)s bs=1048576 skip=$((c*%(chunk_mb)d)) '
+    'count=%(chunk_mb)d 2>/dev/null | md5sum | cut -c1-32; '
+    'c=$((c+1)); done > $d/0 && l=0 && '
+    'while [ $(wc -l < $d/$l) -gt 1 ]; do '
+    'n=$((l+1)); i=0; buf=; '
+    'while read h; do buf=$buf$h; i=$((i+1)); '
+    'if [ $i -eq %(fanout)d ]; then '
+    'printf %%s $buf | md5sum | cut -c1-32; buf=; i=0; fi; '
+    'done < $d/$l > $d/$n; '
+    'if [ -n "$buf" ]; then '
+    'printf %%s $buf | md5sum | cut -c1-32 >> $d/$n; fi; '
+    'l=$n; done && echo $d $l $(cat $d/$l)')
+
+
+class RemoteHashTree(object):
+    """A hash tree of the first length bytes of one side of a comparison
+
+    :param side: InstanceBlockDevTester or HNASVolumeReference. Anything
+        with a data_path attribute and a run_as_root(script) method.
+    :param length: int. Bytes covered by the tree, a multiple of the
+        chunk size.
+    """
+
+    def __init__(self, side, length, chunk_mb=DEFAULT_CHUNK_MB,
+                 fanout=DEFAULT_FANOUT):
+        chunk_size = chunk_mb * regions.MiB
+        if length % chunk_size:
+            raise ValueError("length must be a multiple of %d MB" % chunk_mb)
+        self.side = side
+        self.length = length
+        self.chunk_mb = chunk_mb
+        self.fanout = fanout
+        self.chunks = length // chunk_size
+        self.workdir = None
+        self.top_level = None
+        self.root = None
+
+    def build(self):
+        out = self.side.run_as_root(_BUILD_SCRIPT % {
+            'path': self.side.data_path, 'chunks': self.chunks,
+            'chunk_mb': self.chunk_mb, 'fanout': self.fanout})
+        self.workdir, top_level, self.root = out.split()[-3:]
+        self.top_level = int(top_level)
+        LOG.debug("Hashed %d chunks of %s, root %s.", self.chunks,
+                  self.side.data_path, self.root)
+        return self.root
+
+    def nodes(self, level, start, count):
+        """Returns count digests of a level, starting at index start"""
+        out = self.side.run_as_root("sed -n %d,%dp %s/%d" % (
+            start + 1, start + count, self.workdir, level))
+        return out.split()
+
+    def discard(self):
+        if self.workdir:
+            self.side.run_as_root("rm -rf %s" % self.workdir)
+            self.workdir = None
+
+    def __enter__(self):
+        self.build()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.discard()
+
+
+def diff_chunks(expected, actual, length, chunk_mb=DEFAULT_CHUNK_MB,
+                fanout=DEFAULT_FANOUT):
+    """Finds the chunks in which two sides differ
+
+    :param expected: InstanceBlockDevTester or HNASVolumeReference.
+    :param actual: InstanceBlockDevTester or HNASVolumeReference.
+    :param length: int. Number of bytes to compare, from the start.
+    :returns: list of regions.Region, one per differing chunk.
+    """
+    with RemoteHashTree(expected, length, chunk_mb, fanout) as exp_tree, \
+            RemoteHashTree(actual, length, chunk_mb, fanout) as act_tree:
+        if exp_tree.root == act_tree.root:
+            return []
+
+        # Indices of the differing nodes of the current level
+        differing = [0]
+        for level in range(exp_tree.top_level - 1, -1, -1):
+            children = []
+            for parent in differing:
+                start = parent * fanout
+                exp_nodes = exp_tree.nodes(level, start, fanout)
+                act_nodes = act_tree.nodes(level, start, fanout)
+                children.extend(start + i for i, (e, a) in
+                                enumerate(zip(exp_nodes, act_nodes))
+                                if e != a)
+            differing = children
+
+    chunk_size = chunk_mb * regions.MiB
+    LOG.debug("%d out of %d chunks differ.", len(differing),
+              exp_tree.chunks)
+    return [regions.Region(i * chunk_size, chunk_size) for i in differing]
@@ -0,0 +1,101 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import contextlib
+import threading
+import time
+
+import logging
+
+from cinder_hnas_plugin.tests.utils import results
+from cinder_hnas_plugin.tests.utils import waiters
+
+LOG = logging.getLogger(__name__)
+
+
+class LatencyRecorder(object):
+    """Collects how long cinder operations take, per backend and pool.
+
+    Each operation is split in two: the time until the API accepted the
+    request, which ends when the helper starts waiting for the resource,
+    and the time until the resource became ready, which ends when the last
+    wait of the helper is over. Only waits for cinder resources count:
+    whatever the helper does afterwards (e.g. looking the volume up in HNAS,
+    retrying until its file shows up) is not counted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = collections.OrderedDict()
+
+    @contextlib.contextmanager
+    def measure(self, backend, pool, operation):
+        """Times the operation run within the block
+
+        Nothing is recorded if the block raises.
+        """
+        start = time.time()
+        with waiters.observe_waits() as waits:
+            yield
+        end = time.time()
+        waits = [w for w in waits if waiters.is_resource_wait(w)]
+        if waits:
+            accept = waits[0].started - start
+            ready = waits[-1].started + waits[-1].elapsed - waits[0].started
+        else:
+            accept, ready = end - start, 0.0
+        self.add(backend, pool, operation, accept, ready)
+
+    def add(self, backend, pool, operation, accept, ready):
+        LOG.debug("%s on %s/%s: accepted in %.2f s, ready %.2f s later.",
+                  operation, backend, pool, accept, ready)
+        with self._lock:
+            samples = self._samples.setdefault(
+                (backend, pool, operation), {'accept': [], 'ready': []})
+            samples['accept'].append(accept)
+            samples['ready'].append(ready)
+
+    def report(self):
+        """Returns {backend: {pool: {operation: {phase: stats}}}}
+
+        stats holds the summary of results.summarize plus a histogram.
+        """
+        report = {}
+        with self._lock:
+            items = list(self._samples.items())
+        for (backend, pool, operation), samples in items:
+            ops = report.setdefault(backend, {}).setdefault(pool, {})
+            ops[operation] = dict(
+                (phase, dict(results.summarize(values),
+                             histogram=results.histogram(values)))
+                for phase, values in samples.items())
+        return report
+
+    def format_report(self):
+        lines = []
+        for backend, pools in sorted(self.report().items()):
+            for pool, ops in sorted(pools.items()):
+                for operation, phases in ops.items():
+                    for phase in ('accept', 'ready'):
+                        stats = phases[phase]
+                        lines.append(
+                            '%s/%s %s (%s): p50 %.2f s, p95 %.2f s, '
+                            'max %.2f s' %
+                            (backend, pool, operation, phase, stats['p50'],
+                             stats['p95'], stats['max']))
+                        lines.append(results.format_histogram(
+                            stats['histogram']))
+        return '\n'.join(lines)
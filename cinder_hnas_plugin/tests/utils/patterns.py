@@ -0,0 +1,94 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Reproducible data to fill volumes with.
+
+Filling a volume from /dev/urandom is CPU bound inside small guests, and
+the data it writes can only be checked by reading it back from both ends.
+Pattern blocks are instead determined by a seed and their index: each one
+is the line "hnas-<seed>-<index>" repeated up to the block size. They are
+cheap to produce with yes and head, and anyone knowing the seed can
+compute the digest of any block aligned region without reading it.
+"""
+
+import collections
+import hashlib
+import uuid
+
+from cinder_hnas_plugin.tests.utils import regions
+
+FillResult = collections.namedtuple(
+    'FillResult', ['seed', 'block_size', 'size_mb', 'elapsed'])
+
+
+def new_seed():
+    return uuid.uuid4().hex[:12]
+
+
+def _line(seed, index):
+    return "hnas-%s-%d\n" % (seed, index)
+
+
+def block_bytes(seed, index, block_size):
+    """Returns the contents of a pattern block"""
+    line = _line(seed, index).encode('ascii')
+    repeats = block_size // len(line) + 1
+    return (line * repeats)[:block_size]
+
+
+def write_command(path, seed, size, block_size, offset=0):
+    """Returns a shell command writing pattern blocks to path
+
+    :param size: int. Bytes to write, a multiple of block_size.
+    :param offset: int. Where to start writing, a multiple of block_size.
+        Block indices are counted from the start of path, so the data does
+        not depend on how a fill is split across calls.
+    """
+    first = offset // block_size
+    last = first + size // block_size
+    return ("n=%(first)d; while [ $n -lt %(last)d ]; do "
+            "yes hnas-%(seed)s-$n | head -c %(bs)d; n=$((n+1)); done | "
+            "dd of=%(path)s bs=%(bs)d seek=%(first)d 2>/dev/null" %
+            {'first': first, 'last': last, 'seed': seed, 'bs': block_size,
+             'path': path})
+
+
+def expected_digest(seed, region, block_size):
+    """Returns the md5 of a block aligned region of pattern data"""
+    if region.offset % block_size or region.length % block_size:
+        raise ValueError("Region %s is not aligned to %d bytes" %
+                         (region, block_size))
+    md5 = hashlib.md5()
+    first = region.offset // block_size
+    for index in range(first, first + region.length // block_size):
+        md5.update(block_bytes(seed, index, block_size))
+    return md5.hexdigest()
+
+
+def find_mismatches(side, fill, chunk_mb=64):
+    """Checks data written by a fill without moving it over ssh
+
+    :param side: InstanceBlockDevTester or HNASVolumeReference holding the
+        data.
+    :param fill: FillResult. As returned by
+        InstanceBlockDevTester.fill_with_pattern.
+    :returns: list of regions.Region that do not hold the expected data.
+    """
+    chunk = max(chunk_mb * regions.MiB // fill.block_size, 1) * \
+        fill.block_size
+    region_list = regions.split_range(0, fill.size_mb * regions.MiB, chunk)
+    digests = side.region_digests(region_list)
+    return [r for r, digest in zip(region_list, digests)
+            if digest != expected_digest(fill.seed, r, fill.block_size)]
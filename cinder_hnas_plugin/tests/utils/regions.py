@@ -0,0 +1,159 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Checksums of byte ranges of files and block devices over ssh.
+
+Both sides of a comparison (a block device inside an instance and the file
+backing it in HNAS) compute digests of the same ranges with block sized dd
+reads, so only the digests travel over ssh. Bytes are fetched only to show
+what differs once a mismatch is found.
+"""
+
+import collections
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+MiB = 1024 * 1024
+DEFAULT_BLOCK_SIZE = MiB
+
+# Bytes fetched from each side to describe a mismatching region
+MISMATCH_PREVIEW_BYTES = 64
+
+Region = collections.namedtuple('Region', ['offset', 'length'])
+
+RegionMismatch = collections.namedtuple(
+    'RegionMismatch', ['region', 'expected_digest', 'actual_digest',
+                       'expected_bytes', 'actual_bytes'])
+
+
+def _dd(path, offset, length, block_size):
+    """Reads a block aligned range"""
+    return "dd if=%s bs=%d skip=%d count=%d" % (
+        path, block_size, offset // block_size, length // block_size)
+
+
+def _dd_unaligned(path, offset, length, block_size):
+    """Reads the whole blocks around a range, trimming the bytes outside it
+
+    Busybox dd in small guests knows nothing about skip_bytes/count_bytes,
+    and a block size dividing both ends of the range would often be a
+    single byte, i.e. one read per byte.
+    """
+    first = offset // block_size
+    last = -(-(offset + length) // block_size)
+    command = "dd if=%s bs=%d skip=%d count=%d" % (
+        path, block_size, first, last - first)
+    if offset > first * block_size:
+        command += " | tail -c +%d" % (offset - first * block_size + 1)
+    return command + " | head -c %d" % length
+
+
+def read_command(path, offset, length, block_size=DEFAULT_BLOCK_SIZE):
+    """Returns a shell command that writes a byte range of path to stdout
+
+    The range is split into an unaligned head, a block aligned body and an
+    unaligned tail, each read by its own dd, so that the whole range is
+    read in block_size chunks whatever its boundaries are.
+    """
+    if length <= 0:
+        return "true"
+    end = offset + length
+    body_start = -(-offset // block_size) * block_size
+    body_end = (end // block_size) * block_size
+    if body_start >= body_end:
+        return _dd_unaligned(path, offset, length, block_size)
+
+    parts = []
+    if body_start > offset:
+        parts.append(_dd_unaligned(path, offset, body_start - offset,
+                                   block_size))
+    parts.append(_dd(path, body_start, body_end - body_start, block_size))
+    if end > body_end:
+        parts.append(_dd_unaligned(path, body_end, end - body_end,
+                                   block_size))
+    if len(parts) == 1:
+        return parts[0]
+    return "{ %s; }" % "; ".join(parts)
+
+
+def digest_command(path, regions, block_size=DEFAULT_BLOCK_SIZE):
+    """Returns a shell command printing the md5 of each region, one per line
+
+    The command contains no single quotes, so it can be wrapped in
+    sh -c '...' to be run with sudo.
+    """
+    return "; ".join(
+        "%s 2>/dev/null | md5sum" % read_command(path, r.offset, r.length,
+                                                 block_size)
+        for r in regions)
+
+
+def parse_digests(output, regions):
+    """Returns a list of digests out of the output of digest_command"""
+    digests = [line.split()[0] for line in output.splitlines()
+               if line.strip()]
+    if len(digests) != len(regions):
+        raise Exception("Expected %d digests, got: %s" %
+                        (len(regions), output))
+    return digests
+
+
+def as_regions(regions):
+    return [Region(*r) for r in regions]
+
+
+def compare_regions(expected, actual, regions):
+    """Compares byte ranges of two sides by their digests
+
+    :param expected: object with region_digests(regions) and
+        read_region(offset, length) methods, such as an
+        HNASVolumeReference or an InstanceBlockDevTester.
+    :param actual: same as expected.
+    :param regions: list of Region or (offset, length) tuples.
+    :returns: list of RegionMismatch, empty if every region matches.
+    """
+    regions = as_regions(regions)
+    expected_digests = expected.region_digests(regions)
+    actual_digests = actual.region_digests(regions)
+
+    mismatches = []
+    for region, exp, act in zip(regions, expected_digests, actual_digests):
+        if exp == act:
+            continue
+        preview = min(region.length, MISMATCH_PREVIEW_BYTES)
+        mismatches.append(RegionMismatch(
+            region, exp, act,
+            expected.read_region(region.offset, preview),
+            actual.read_region(region.offset, preview)))
+    if mismatches:
+        LOG.debug("%d out of %d regions differ.", len(mismatches),
+                  len(regions))
+    return mismatches
+
+
+def format_mismatches(mismatches):
+    return "\n".join(
+        "offset %d, length %d: expected %s (%r...), got %s (%r...)" %
+        (m.region.offset, m.region.length, m.expected_digest,
+         m.expected_bytes, m.actual_digest, m.actual_bytes)
+        for m in mismatches)
+
+
+def split_range(offset, length, chunk_size):
+    """Splits a byte range in consecutive regions of up to chunk_size"""
+    return [Region(start, min(chunk_size, offset + length - start))
+            for start in range(offset, offset + length, chunk_size)]
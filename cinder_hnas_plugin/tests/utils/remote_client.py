@@ -23,6 +23,9 @@ from tempest.lib.common import ssh
 from tempest.lib.common.utils import test_utils
 import tempest.lib.exceptions
 
+from cinder_hnas_plugin.tests.utils import ssh_profiler
+from cinder_hnas_plugin.tests.utils import timeline
+
 CONF = config.CONF
 
 LOG = logging.getLogger(__name__)
@@ -61,6 +64,8 @@ def debug_ssh(function):
 
 class RemoteClient(object):
 
+    ssh_client_class = ssh.Client
+
     def __init__(self, ip_address, username, password=None, pkey=None,
                  server=None, servers_client=None):
         """Executes commands in a VM over ssh
@@ -78,17 +83,21 @@ class RemoteClient(object):
         connect_timeout = CONF.validation.connect_timeout
         self.log_console = CONF.compute_feature_enabled.console_output
 
-        self.ssh_client = ssh.Client(ip_address, username, password,
-                                     ssh_timeout, pkey=pkey,
-                                     channel_timeout=connect_timeout)
+        self.ssh_client = self.ssh_client_class(
+            ip_address, username, password, ssh_timeout, pkey=pkey,
+            channel_timeout=connect_timeout)
 
     @debug_ssh
+    @timeline.traced('ssh', lambda self, cmd: 'ssh %s: %s' % (
+        self.ssh_client.host, ssh_profiler.template(cmd)[:60]))
     def exec_command(self, cmd):
         # Shell options below add more clearness on failures,
         # path is extended for some non-cirros guest oses (centos7)
-        cmd = CONF.validation.ssh_shell_prologue + " " + cmd
-        LOG.debug("Remote command: %s" % cmd)
-        return self.ssh_client.exec_command(cmd)
+        full_cmd = CONF.validation.ssh_shell_prologue + " " + cmd
+        LOG.debug("Remote command: %s", ssh_profiler.mask(full_cmd))
+        return ssh_profiler.call(
+            self.ssh_client.host, cmd,
+            lambda: self.ssh_client.exec_command(full_cmd))
 
     @debug_ssh
     def validate_authentication(self):
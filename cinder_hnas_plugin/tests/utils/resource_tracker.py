@@ -0,0 +1,128 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+
+import logging
+
+import six
+import testtools
+
+from cinder_hnas_plugin.tests.utils import concurrency
+
+LOG = logging.getLogger(__name__)
+
+TrackedResource = collections.namedtuple(
+    'TrackedResource', ['kind', 'id', 'delete', 'parents'])
+
+
+class ResourceTracker(object):
+    """Deletes the resources of a test, as much in parallel as possible.
+
+    Resources are added along with the resources they depend on (their
+    parents), e.g. a snapshot and the volume it was taken from. Teardown
+    goes level by level: every resource no remaining resource depends on
+    is deleted at once, then the deletions are waited for in bulk, one
+    wait per kind of resource, and so on until nothing is left.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._resources = collections.OrderedDict()
+        self._waiters = {}
+
+    def register_kind(self, kind, wait_deleted=None):
+        """Tells how to wait for the deletion of resources of a kind
+
+        :param wait_deleted: callable. Receives a list of ids and returns
+            once they are all gone. Without it, deletions are not waited
+            for.
+        """
+        self._waiters[kind] = wait_deleted
+
+    def add(self, kind, resource_id, delete, parents=()):
+        """Tracks a resource
+
+        :param delete: callable. Receives the id and requests the deletion
+            of the resource, ignoring it if already gone.
+        :param parents: iterable of tuples <kind, id>. Resources that can
+            only be deleted after this one.
+        """
+        with self._lock:
+            self._resources[(kind, resource_id)] = TrackedResource(
+                kind, resource_id, delete, tuple(parents))
+
+    def discard(self, kind, resource_id):
+        """Stops tracking a resource, e.g. one the test already deleted"""
+        with self._lock:
+            self._resources.pop((kind, resource_id), None)
+
+    def __len__(self):
+        return len(self._resources)
+
+    def _levels(self):
+        """Yields lists of resources that can be deleted together"""
+        remaining = collections.OrderedDict(self._resources)
+        while remaining:
+            parents = set(p for r in remaining.values() for p in r.parents)
+            level = [r for key, r in remaining.items() if key not in parents]
+            if not level:
+                LOG.warning("Dependency cycle among %s, deleting them "
+                            "anyway.", list(remaining))
+                level = list(remaining.values())
+            for r in level:
+                del remaining[(r.kind, r.id)]
+            yield level
+
+    def teardown(self):
+        """Deletes every tracked resource
+
+        :returns: list. The exc_info of every failed deletion or wait.
+        """
+        with self._lock:
+            levels = list(self._levels())
+            self._resources.clear()
+
+        exc_infos = []
+        for level in levels:
+            LOG.debug("Deleting %s.",
+                      ', '.join('%s %s' % (r.kind, r.id) for r in level))
+            outcomes = concurrency.run_concurrently(
+                lambda r: r.delete(r.id), [(r,) for r in level],
+                max_workers=self.max_workers, name='teardown')
+
+            deleted = collections.OrderedDict()
+            for r, (_, exc_info) in zip(level, outcomes):
+                if exc_info is not None:
+                    exc_infos.append(exc_info)
+                elif self._waiters.get(r.kind) is not None:
+                    deleted.setdefault(r.kind, []).append(r.id)
+
+            outcomes = concurrency.run_concurrently(
+                lambda kind, ids: self._waiters[kind](ids),
+                list(deleted.items()), name='teardown-wait')
+            exc_infos.extend(exc_info for _, exc_info in outcomes
+                             if exc_info is not None)
+        return exc_infos
+
+    def teardown_or_raise(self):
+        """Same as teardown, raising whatever failed"""
+        exc_infos = self.teardown()
+        if len(exc_infos) == 1:
+            six.reraise(*exc_infos[0])
+        elif exc_infos:
+            raise testtools.MultipleExceptions(*exc_infos)
@@ -0,0 +1,124 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import json
+import os
+import tempfile
+import time
+
+import logging
+
+from tempest import config
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+
+def results_dir():
+    """Returns the directory measurements are saved to, creating it"""
+    path = CONF.hnas.results_dir or os.path.join(tempfile.gettempdir(),
+                                                 'cinder-hnas-results')
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    return path
+
+
+def _result_path(kind, name, extension):
+    parts = [kind] + ([name] if name else []) + \
+        [time.strftime('%Y%m%d-%H%M%S')]
+    return os.path.join(results_dir(),
+                        '%s.%s' % ('-'.join(parts), extension))
+
+
+def write_json(kind, data, name=None):
+    """Saves data as <kind>[-<name>]-<timestamp>.json in results_dir
+
+    :returns: string. The path of the file.
+    """
+    path = _result_path(kind, name, 'json')
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    LOG.info("Saved %s results to %s.", kind, path)
+    return path
+
+
+def write_text(kind, text, name=None):
+    """Saves text as <kind>[-<name>]-<timestamp>.txt in results_dir"""
+    path = _result_path(kind, name, 'txt')
+    with open(path, 'w') as f:
+        f.write(text)
+        f.write('\n')
+    return path
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+def summarize(values, points=(50, 95, 99)):
+    """Returns count, min, mean, max and the given percentiles of values"""
+    values = sorted(values)
+    summary = {'count': len(values)}
+    if values:
+        summary.update({'min': values[0], 'max': values[-1],
+                        'mean': sum(values) / float(len(values))})
+    for pct in points:
+        summary['p%d' % pct] = percentile(values, pct)
+    return summary
+
+
+# Upper bounds, in seconds, of the buckets of latency histograms
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500)
+
+
+def histogram(values, bounds=LATENCY_BUCKETS):
+    """Counts values into buckets of the given upper bounds
+
+    :returns: list of tuples <upper bound, count>. The last bucket, with
+        None as bound, counts whatever exceeds the last bound.
+    """
+    counts = [0] * (len(bounds) + 1)
+    for value in values:
+        for idx, bound in enumerate(bounds):
+            if value <= bound:
+                counts[idx] += 1
+                break
+        else:
+            counts[-1] += 1
+    return list(zip(list(bounds) + [None], counts))
+
+
+def format_histogram(hist, width=40):
+    """Renders a histogram as one text bar per non empty bucket"""
+    peak = max([count for _, count in hist] + [1])
+    lines = []
+    for idx, (bound, count) in enumerate(hist):
+        if not count:
+            continue
+        if bound is None:
+            label = '> %gs' % hist[idx - 1][0]
+        else:
+            label = '<= %gs' % bound
+        bar = '#' * int(round(width * count / float(peak)))
+        lines.append('%10s | %-*s %d' % (label, width, bar, count))
+    return '\n'.join(lines)
@@ -0,0 +1,189 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Admission control for SSC sessions.
+
+HNAS refuses SSC sessions past a small limit, and cinder-volume needs some
+of them to do its job. Every ssc call the plugin makes first takes a slot
+from the governor of its HNAS, which only hands out the slots cinder-volume
+is not expected to need ([hnas] ssc_session_limit minus [hnas]
+ssc_sessions_reserved). Slots are granted in arrival order, so that a call
+asking for every slot at once (SSCLimitTester) is not starved by a steady
+flow of single ones.
+
+Governors are process-wide: they keep the tests running in one process
+within the limit, not several test runners sharing the same HNAS.
+"""
+
+import atexit
+import collections
+import threading
+import time
+
+import logging
+
+from tempest import config
+
+from cinder_hnas_plugin.tests.utils import results
+from cinder_hnas_plugin.tests.utils import timeline
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+
+class SSCQueueTimeout(Exception):
+    pass
+
+
+class SSCGovernor(object):
+    """A FIFO semaphore over the SSC sessions of one HNAS"""
+
+    def __init__(self, name, slots, timeout=None):
+        self.name = name
+        self.slots = max(slots, 1)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._queue = collections.deque()
+        self._in_use = 0
+        self.waits = []
+        self.timeouts = 0
+        self.max_queue_length = 0
+        self.max_in_use = 0
+
+    def _acquire(self, count):
+        ticket = object()
+        start = timeline.now()
+        with self._cond:
+            self._queue.append(ticket)
+            self.max_queue_length = max(self.max_queue_length,
+                                        len(self._queue))
+            deadline = None if self.timeout is None else \
+                time.time() + self.timeout
+            try:
+                while (self._queue[0] is not ticket or
+                       self._in_use + count > self.slots):
+                    remaining = None if deadline is None else \
+                        deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        self.timeouts += 1
+                        raise SSCQueueTimeout(
+                            "Waited more than %ss for %d SSC session(s) on "
+                            "%s." % (self.timeout, count, self.name))
+                    self._cond.wait(remaining)
+            finally:
+                if self._queue[0] is ticket:
+                    self._queue.popleft()
+                else:
+                    self._queue.remove(ticket)
+                # the next in line may be able to go now
+                self._cond.notify_all()
+            self._in_use += count
+            self.max_in_use = max(self.max_in_use, self._in_use)
+            waited = timeline.now() - start
+            self.waits.append(waited)
+        if waited > 0.01:
+            timeline.record('ssc queue %s' % self.name, 'wait', start,
+                            start + waited)
+        return waited
+
+    def _release(self, count):
+        with self._cond:
+            self._in_use -= count
+            self._cond.notify_all()
+
+    def session(self):
+        """Returns a held slot, to be released (or used as a context)"""
+        self._acquire(1)
+        return _Hold(self, 1)
+
+    def exclusive(self):
+        """Returns a hold over every slot of the governor
+
+        Meant for tests that saturate the HNAS on purpose: no other ssc
+        call of this process will run until the hold is released.
+        """
+        self._acquire(self.slots)
+        return _Hold(self, self.slots)
+
+    def stats(self):
+        with self._cond:
+            waits = list(self.waits)
+            in_use, queued = self._in_use, len(self._queue)
+        stats = {'name': self.name,
+                 'slots': self.slots,
+                 'in_use': in_use,
+                 'queued': queued,
+                 'max_in_use': self.max_in_use,
+                 'max_queue_length': self.max_queue_length,
+                 'timeouts': self.timeouts,
+                 'queue_time': results.summarize(waits)}
+        return stats
+
+
+class _Hold(object):
+    """Slots taken from a governor, released once"""
+
+    def __init__(self, governor, count):
+        self._governor = governor
+        self._count = count
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            count, self._count = self._count, 0
+        if count:
+            self._governor._release(count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+_lock = threading.Lock()
+_governors = {}
+
+
+def get_governor(hnas_ip):
+    """Returns the process-wide governor of the HNAS at hnas_ip"""
+    with _lock:
+        governor = _governors.get(hnas_ip)
+        if governor is None:
+            slots = (CONF.hnas.ssc_session_limit -
+                     CONF.hnas.ssc_sessions_reserved)
+            if slots < 1:
+                LOG.warning("[hnas] ssc_sessions_reserved leaves no SSC "
+                            "session to the tests, allowing one anyway.")
+            governor = _governors[hnas_ip] = SSCGovernor(
+                hnas_ip, slots, CONF.hnas.ssc_queue_timeout or None)
+        return governor
+
+
+def _dump_stats():
+    stats = [g.stats() for g in list(_governors.values()) if g.waits]
+    if not stats:
+        return
+    for s in stats:
+        LOG.debug("SSC governor %(name)s: %(slots)d slots, at most "
+                  "%(max_queue_length)d queued, queue time %(queue_time)s",
+                  s)
+    try:
+        results.write_json('ssc-governor', stats)
+    except (IOError, OSError) as e:
+        LOG.warning("Could not save the SSC governor stats: %s", e)
+
+
+atexit.register(_dump_stats)
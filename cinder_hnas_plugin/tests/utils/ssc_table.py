@@ -0,0 +1,162 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Parsing of the tables printed by ssc commands.
+
+Commands such as 'evs list' or 'filesystem-list' print a header line, a
+line of dashes and then one line per row:
+
+    EVS ID  Type     IP Address
+    ------  -------  -----------
+         1  Service  172.24.44.20
+                     172.24.44.21
+
+Each group of dashes gives the position and width of a column. A line whose
+first column is empty continues the row above it: its non empty cells are
+appended to that row, cells holding more than one value becoming lists.
+The last column runs to the end of the line.
+
+Layouts are computed once per separator line and reused, and rows are
+yielded as they are parsed.
+"""
+
+import re
+import threading
+
+try:
+    from collections import abc as collections_abc
+except ImportError:
+    import collections as collections_abc
+
+_SEPARATOR_REGEX = re.compile(r'^[- ]+$')
+_DASHES_REGEX = re.compile(r'-+')
+
+
+class _ColumnIndex(object):
+    """The names of the columns of a table, and their positions"""
+
+    __slots__ = ('names', 'positions')
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.positions = dict((name, idx) for idx, name in
+                              enumerate(self.names))
+
+
+class TableLayout(object):
+    """The column spans described by a separator line"""
+
+    def __init__(self, separator_line):
+        self.spans = [m.span() for m in
+                      _DASHES_REGEX.finditer(separator_line)]
+        self._indexes = {}
+
+    def split(self, line):
+        """Returns the stripped contents of every column of line"""
+        values = [line[start:end].strip() for start, end in self.spans[:-1]]
+        values.append(line[self.spans[-1][0]:].strip())
+        return values
+
+    def column_index(self, header_line):
+        index = self._indexes.get(header_line)
+        if index is None:
+            index = self._indexes[header_line] = _ColumnIndex(
+                self.split(header_line))
+        return index
+
+
+_layouts = {}
+_layouts_lock = threading.Lock()
+
+
+def get_layout(separator_line):
+    """Returns the cached TableLayout of separator_line"""
+    with _layouts_lock:
+        layout = _layouts.get(separator_line)
+        if layout is None:
+            layout = _layouts[separator_line] = TableLayout(separator_line)
+        return layout
+
+
+class TableRow(collections_abc.Mapping):
+    """A read-only row of a table, indexed by column name
+
+    Rows share the column index of their table and only hold a tuple of
+    values each.
+    """
+
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index, values):
+        self._index = index
+        self._values = tuple(values)
+
+    def __getitem__(self, key):
+        return self._values[self._index.positions[key]]
+
+    def __iter__(self):
+        return iter(self._index.names)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return 'TableRow(%r)' % dict(self)
+
+
+def _is_separator(line):
+    return _SEPARATOR_REGEX.match(line) is not None and not line.isspace()
+
+
+def iter_rows(lines):
+    """Yields the rows of the table in lines as TableRows
+
+    :param lines: string, or an iterable of lines.
+    """
+    if hasattr(lines, 'splitlines'):
+        lines = lines.splitlines()
+
+    layout = index = header = pending = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if layout is None:
+            if _is_separator(line) and header is not None:
+                layout = get_layout(line)
+                index = layout.column_index(header)
+            header = line
+            continue
+
+        if not line or line.isspace():
+            continue
+
+        values = layout.split(line)
+        if not values[0] and pending is not None:
+            # continuation line
+            for idx, value in enumerate(values):
+                if not value:
+                    continue
+                if not pending[idx]:
+                    pending[idx] = value
+                    continue
+                if not isinstance(pending[idx], list):
+                    pending[idx] = [pending[idx]]
+                pending[idx].append(value)
+        else:
+            if pending is not None:
+                yield TableRow(index, pending)
+            pending = values
+
+    if pending is not None:
+        yield TableRow(index, pending)
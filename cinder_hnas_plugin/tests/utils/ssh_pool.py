@@ -0,0 +1,151 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import atexit
+import threading
+import time
+
+import logging
+
+from tempest.lib.common import ssh
+
+LOG = logging.getLogger(__name__)
+
+
+class SSHConnectionPool(object):
+    """A process-wide cache of authenticated ssh connections.
+
+    tempest's ssh.Client opens (and authenticates) a brand new connection
+    for every command it runs. Since paramiko multiplexes channels over a
+    single transport, one live connection per (host, user, port) is enough
+    to serve every client talking to the same HNAS, so connections are kept
+    here and leased to whoever asks for them as long as they are healthy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._connections = {}
+        self.hits = 0
+        self.misses = 0
+        self.handshakes = 0
+        self.handshake_time = 0.0
+
+    def _get_key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _is_healthy(connection):
+        transport = connection.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # cheap keepalive, fails fast if the peer went away
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def lease(self, key, connect):
+        """Returns a healthy connection for key, creating one if needed.
+
+        :param key: tuple. Something like (host, username, port).
+        :param connect: callable. Performs the actual handshake and returns
+            a connected paramiko.SSHClient.
+        :returns: paramiko.SSHClient. A connected ssh client.
+        """
+        with self._get_key_lock(key):
+            connection = self._connections.get(key)
+            if connection is not None:
+                if self._is_healthy(connection):
+                    self.hits += 1
+                    return connection
+                LOG.debug("Dropping stale ssh connection to %s@%s.",
+                          key[1], key[0])
+                self._close(connection)
+
+            self.misses += 1
+            start = time.time()
+            connection = connect()
+            elapsed = time.time() - start
+            self.handshakes += 1
+            self.handshake_time += elapsed
+            LOG.debug("ssh handshake with %s@%s took %.3f s.",
+                      key[1], key[0], elapsed)
+            self._connections[key] = connection
+            return connection
+
+    def invalidate(self, key):
+        with self._get_key_lock(key):
+            connection = self._connections.pop(key, None)
+            if connection is not None:
+                self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._lock:
+            keys = list(self._connections)
+        for key in keys:
+            self.invalidate(key)
+
+    def stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'handshakes': self.handshakes,
+                'handshake_time': self.handshake_time,
+                'open_connections': len(self._connections)}
+
+
+_POOL = SSHConnectionPool()
+
+
+def get_pool():
+    return _POOL
+
+
+def _shutdown_pool():
+    LOG.debug("ssh connection pool stats: %s", _POOL.stats())
+    _POOL.close_all()
+
+
+atexit.register(_shutdown_pool)
+
+
+class PooledSSHClient(ssh.Client):
+    """An ssh.Client that leases its connections from the process pool"""
+
+    def _pool_key(self):
+        return (self.host, self.username, getattr(self, 'port', 22))
+
+    def _get_ssh_connection(self, sleep=1.5, backoff=1):
+        parent = super(PooledSSHClient, self)._get_ssh_connection
+
+        def connect():
+            return parent(sleep=sleep, backoff=backoff)
+
+        return _POOL.lease(self._pool_key(), connect)
+
+    def test_connection_auth(self):
+        """Raises an exception when we can not connect to server via ssh."""
+        # The parent closes the connection afterwards, which would throw
+        # away a perfectly good pooled connection.
+        self._get_ssh_connection()
@@ -0,0 +1,175 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Where the time spent running commands over ssh goes.
+
+When [hnas] ssh_profiling is set, every command run through a RemoteClient
+(HNASClient included) is recorded with its host, its template, how long it
+took, how much it printed and its exit status. Templates are commands with
+secrets masked and ids and numbers replaced by placeholders, so that the
+same command run against different volumes adds up. A ranked summary is
+logged and saved to [hnas] results_dir when the process exits.
+"""
+
+import atexit
+import collections
+import re
+import sys
+import threading
+import time
+
+import logging
+
+import six
+from tempest import config
+from tempest.lib import exceptions as lib_exc
+
+from cinder_hnas_plugin.tests.utils import results
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+MASK = '***'
+
+# The sudo password HNASClient pipes into "sudo -S"
+_SUDO_PASSWORD_REGEX = re.compile(r"echo\s+'[^']*'(\s*\|\s*sudo\s+-S)")
+_UUID_REGEX = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.I)
+_NUMBER_REGEX = re.compile(r'(?<![\w-])\d+(?![\w-])')
+_EXIT_STATUS_REGEX = re.compile(r'exit status: (\d+)')
+
+SSHCommandRecord = collections.namedtuple(
+    'SSHCommandRecord', ['host', 'template', 'duration', 'output_bytes',
+                         'exit_status'])
+
+_secrets = set()
+_lock = threading.Lock()
+_records = []
+
+
+def register_secret(secret):
+    """Makes mask hide secret wherever it shows up in a command"""
+    if secret:
+        with _lock:
+            _secrets.add(secret)
+
+
+def mask(command):
+    """Returns command with the sudo password and known secrets hidden"""
+    command = _SUDO_PASSWORD_REGEX.sub(r"echo '%s'\1" % MASK, command)
+    for secret in list(_secrets):
+        command = command.replace(secret, MASK)
+    return command
+
+
+def template(command):
+    """Returns the masked command with uuids and numbers as placeholders"""
+    command = _UUID_REGEX.sub('<uuid>', mask(command))
+    return _NUMBER_REGEX.sub('<n>', command)
+
+
+def enabled():
+    return CONF.hnas.ssh_profiling
+
+
+def _exit_status(exc):
+    if isinstance(exc, lib_exc.SSHExecCommandFailed):
+        match = _EXIT_STATUS_REGEX.search(six.text_type(exc))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def call(host, command, function):
+    """Runs function(), recording it as the execution of command on host"""
+    if not enabled():
+        return function()
+    start = time.time()
+    try:
+        output = function()
+    except Exception as e:
+        exc_info = sys.exc_info()
+        _record(host, command, time.time() - start, 0, _exit_status(e))
+        six.reraise(*exc_info)
+    _record(host, command, time.time() - start, len(output or ''), 0)
+    return output
+
+
+def _record(host, command, duration, output_bytes, exit_status):
+    record = SSHCommandRecord(host, template(command), duration,
+                              output_bytes, exit_status)
+    with _lock:
+        _records.append(record)
+
+
+def get_records():
+    with _lock:
+        return list(_records)
+
+
+def summarize(records=None):
+    """Aggregates records by host and template
+
+    :returns: list of dicts, sorted by total time spent, most expensive
+        first.
+    """
+    if records is None:
+        records = get_records()
+    groups = collections.OrderedDict()
+    for r in records:
+        group = groups.setdefault((r.host, r.template), {
+            'host': r.host, 'template': r.template, 'count': 0,
+            'total_time': 0.0, 'max_time': 0.0, 'output_bytes': 0,
+            'failures': 0})
+        group['count'] += 1
+        group['total_time'] += r.duration
+        group['max_time'] = max(group['max_time'], r.duration)
+        group['output_bytes'] += r.output_bytes
+        if r.exit_status:
+            group['failures'] += 1
+    summary = list(groups.values())
+    for group in summary:
+        group['mean_time'] = group['total_time'] / group['count']
+    summary.sort(key=lambda g: g['total_time'], reverse=True)
+    return summary
+
+
+def format_summary(summary, top=15):
+    def _lines(title, groups):
+        lines = [title]
+        for g in groups[:top]:
+            lines.append('%8.1fs %6dx %7.2fs avg %9dB %s: %s' % (
+                g['total_time'], g['count'], g['mean_time'],
+                g['output_bytes'], g['host'], g['template'][:100]))
+        return lines
+
+    by_count = sorted(summary, key=lambda g: g['count'], reverse=True)
+    return '\n'.join(
+        _lines('Most expensive ssh commands:', summary) +
+        _lines('Most frequent ssh commands:', by_count))
+
+
+def _dump_summary():
+    if not _records:
+        return
+    summary = summarize()
+    LOG.info("ssh profile:\n%s", format_summary(summary))
+    try:
+        results.write_json('ssh-profile', summary)
+    except (IOError, OSError) as e:
+        LOG.warning("Could not save the ssh profile: %s", e)
+
+
+atexit.register(_dump_summary)
@@ -0,0 +1,247 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Removal of the files failed runs leave behind in HNAS.
+
+The cinder export directories of every backend are listed and their
+volume-*, snapshot-* and unmanage-* files compared with the volumes and
+snapshots cinder knows about. Files of unknown ids, as well as unmanaged
+files, are orphans and are removed with one ssc round trip per backend.
+Files younger than [hnas] orphan_min_age minutes are left alone, since they
+may belong to a test that is still running.
+
+Runs on its own with:
+
+    python -m cinder_hnas_plugin.tests.utils.sweeper [--delete]
+
+and, depending on [hnas] sweep_orphans, once per test process before the
+first HNAS test class.
+"""
+
+import argparse
+import collections
+import re
+import sys
+import threading
+
+import logging
+
+from tempest import config
+
+from cinder_hnas_plugin.tests.utils import clients
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+_FILE_REGEX = re.compile(
+    r'/(?P<prefix>unmanage-)?(?P<kind>volume|snapshot)-'
+    r'(?P<uuid>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-'
+    r'[0-9a-f]{12})(?:\.iscsi)?$')
+
+# Items asked for in each page of a cinder listing
+LIST_PAGE_SIZE = 1000
+
+Orphan = collections.namedtuple(
+    'Orphan', ['backend', 'evs_idx', 'unix_path', 'fs_name', 'ssc_path',
+               'uuid', 'reason'])
+
+
+class IncompleteListing(Exception):
+    """Cinder's listing could not be followed to its end"""
+
+
+def _list_all(list_page, key):
+    """Returns every item of a paginated cinder listing
+
+    Pages are requested with marker until an empty one comes back, rather
+    than until a short one does: cinder cuts pages at osapi_max_limit, which
+    may be smaller than the limit asked for.
+
+    :param list_page: callable. Receives the query parameters and returns
+        the response body.
+    :raises IncompleteListing: if the marker stops moving forward.
+    """
+    items = []
+    seen = set()
+    marker = None
+    while True:
+        params = {'all_tenants': 1, 'limit': LIST_PAGE_SIZE}
+        if marker is not None:
+            params['marker'] = marker
+        page = list_page(params)[key]
+        if not page:
+            return items
+        new = [item for item in page if item['id'] not in seen]
+        if not new:
+            raise IncompleteListing(
+                "Listing %s did not move past marker %s" % (key, marker))
+        seen.update(item['id'] for item in new)
+        items.extend(new)
+        marker = page[-1]['id']
+
+
+def cinder_resource_ids(volumes_client, snapshots_client):
+    """Returns the ids of every volume and snapshot cinder knows about
+
+    Volumes that were migrated are known by their name id as well, which is
+    what their files are named after.
+
+    :raises IncompleteListing: if cinder could not be listed to the end, in
+        which case nothing can be told apart from an orphan.
+    """
+    ids = set()
+    for vol in _list_all(
+            lambda params: volumes_client.list_volumes(detail=True,
+                                                       params=params),
+            'volumes'):
+        ids.add(vol['id'])
+        name_id = vol.get('os-vol-mig-status-attr:name_id')
+        if name_id:
+            ids.add(name_id)
+    for snap in _list_all(
+            lambda params: snapshots_client.list_snapshots(**params),
+            'snapshots'):
+        ids.add(snap['id'])
+    return ids
+
+
+def _export_filesystems(backend, svc_idx):
+    try:
+        return backend.evs_catalog.filesystems(backend.evs_idx[svc_idx])
+    except Exception as e:
+        LOG.debug("Could not list the filesystems of %s: %s", backend.name,
+                  e)
+        return ()
+
+
+def find_orphans(backend, known_ids, min_age=None):
+    """Lists the orphan files in the export directories of a backend
+
+    :param known_ids: set. The ids of every cinder volume and snapshot.
+    :param min_age: int. Minutes since a file was last modified for it to
+        be considered, [hnas] orphan_min_age by default.
+    :returns: list of Orphan.
+    """
+    if min_age is None:
+        min_age = CONF.hnas.orphan_min_age
+    orphans = []
+    seen = set()
+    for svc_idx, export in enumerate(backend.export_path):
+        filesystems = _export_filesystems(backend, svc_idx)
+        find = ("find /mnt/lb/*/fs-by-name/*/%s -maxdepth 1 -type f "
+                "-mmin +%d \\( -name 'volume-*' -o -name 'snapshot-*' "
+                "-o -name 'unmanage-*' \\) 2>/dev/null; true" %
+                (export.strip('/'), min_age))
+        for path in backend.exec_command(find).split('\n'):
+            path = path.strip()
+            match = _FILE_REGEX.search(path)
+            if match is None or path in seen:
+                continue
+            unix_path, fs_name, ssc_path = (
+                clients.VolumePathIndex.make_entry(path))
+            # other EVSes may export directories of the same name
+            if filesystems and fs_name not in filesystems:
+                continue
+            seen.add(path)
+            if match.group('prefix'):
+                reason = 'unmanaged'
+            elif match.group('uuid') not in known_ids:
+                reason = 'unknown %s' % match.group('kind')
+            else:
+                continue
+            orphans.append(Orphan(backend, backend.evs_idx[svc_idx],
+                                  unix_path, fs_name, ssc_path,
+                                  match.group('uuid'), reason))
+    return orphans
+
+
+def sweep(backends, volumes_client, snapshots_client, dry_run=True,
+          min_age=None):
+    """Finds, and unless dry_run, removes the orphans of every backend
+
+    :returns: list of Orphan. Those found.
+    :raises IncompleteListing: see cinder_resource_ids. Nothing is removed
+        then.
+    """
+    known_ids = cinder_resource_ids(volumes_client, snapshots_client)
+    found = []
+    for backend in backends:
+        orphans = find_orphans(backend, known_ids, min_age)
+        found.extend(orphans)
+        for orphan in orphans:
+            LOG.info("%s %s:%s (%s).",
+                     "Would remove" if dry_run else "Removing",
+                     backend.name, orphan.unix_path, orphan.reason)
+        if dry_run or not orphans:
+            continue
+        results = backend.ssc_rm_many(
+            [(o.evs_idx, o.fs_name, o.ssc_path) for o in orphans])
+        backend.volume_index.invalidate()
+        failed = [r for r in results if r.failed]
+        LOG.info("Removed %d orphan files from %s%s.",
+                 len(orphans) - len(failed), backend.name,
+                 " (%d could not be removed)" % len(failed) if failed else "")
+    return found
+
+
+_swept = False
+_swept_lock = threading.Lock()
+
+
+def sweep_once(backends, volumes_client, snapshots_client):
+    """Sweeps as told by [hnas] sweep_orphans, the first time it is called
+
+    Meant as a hook run before the tests: failures are logged, not raised.
+    """
+    global _swept
+    mode = CONF.hnas.sweep_orphans
+    with _swept_lock:
+        if _swept or mode == 'off':
+            return
+        _swept = True
+        try:
+            sweep(backends, volumes_client, snapshots_client,
+                  dry_run=(mode == 'dry-run'))
+        except Exception:
+            LOG.exception("Sweeping orphan files failed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Lists, and with --delete removes, the files failed "
+                    "test runs left in the HNAS backends of tempest.conf.")
+    parser.add_argument('--delete', action='store_true',
+                        help="remove the orphans instead of listing them")
+    parser.add_argument('--min-age', type=int, default=None,
+                        help="minutes since an orphan was last modified, "
+                             "[hnas] orphan_min_age by default")
+    args = parser.parse_args(argv)
+
+    from tempest import clients as tempest_clients
+    from tempest.common import credentials_factory
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    manager = tempest_clients.Manager(
+        credentials_factory.get_configured_admin_credentials())
+    orphans = sweep(clients.HNASCinderBackend.create_backends_from_conf(),
+                    manager.volumes_v2_client, manager.snapshots_v2_client,
+                    dry_run=not args.delete, min_age=args.min_age)
+    print("%d orphan file(s)%s." % (len(orphans),
+                                    "" if args.delete else " found"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Where the time of a test goes.
+
+A Timeline is a tree of spans. Tests mark their steps (see
+BaseHNASTest.step) and open spans of their own, while API calls, waits and
+ssh commands are recorded as leaves under whatever span is open in the
+thread that performed them. Every test activates a timeline of its own and
+saves it once it is over.
+"""
+
+import collections
+import functools
+import re
+import sys
+import threading
+import time
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+_STEP_LEVEL_REGEX = re.compile(r'^\s*(\d+(?:\.\d+)*)\s*->')
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class Span(object):
+
+    __slots__ = ('name', 'kind', 'start', 'end', 'outcome', 'children',
+                 'thread', 'level')
+
+    def __init__(self, name, kind, start=None, level=None):
+        self.name = name
+        self.kind = kind
+        self.start = _clock() if start is None else start
+        self.end = None
+        self.outcome = None
+        self.children = []
+        self.thread = threading.current_thread().name
+        self.level = level
+
+    def close(self, outcome='ok', end=None):
+        if self.end is None:
+            self.end = _clock() if end is None else end
+            self.outcome = outcome
+
+    @property
+    def duration(self):
+        end = self.end if self.end is not None else _clock()
+        return end - self.start
+
+    def walk(self, depth=0):
+        yield depth, self
+        for child in self.children:
+            for item in child.walk(depth + 1):
+                yield item
+
+    def to_dict(self, origin):
+        return {'name': self.name,
+                'kind': self.kind,
+                'start': self.start - origin,
+                'duration': self.duration,
+                'outcome': self.outcome,
+                'thread': self.thread,
+                'children': [c.to_dict(origin) for c in self.children]}
+
+
+class Timeline(object):
+    """The spans of a test, as a tree rooted at a span named after it"""
+
+    def __init__(self, name):
+        self.root = Span(name, 'test')
+        # wall clock time of root.start, to line spans up with logs
+        self.wall_start = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._owner = threading.current_thread()
+        self._failed = False
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _parent(self):
+        """Returns the span new spans of this thread belong to, if any
+
+        Threads other than the one that created the timeline only record
+        spans once they open one of their own (e.g. run_on_backends
+        workers), so that unrelated background threads stay out of it.
+        """
+        stack = self._stack()
+        if stack:
+            return stack[-1]
+        if threading.current_thread() is self._owner:
+            return self.root
+        return None
+
+    def current_span(self):
+        """Returns the innermost open span of this thread, if any"""
+        return self._parent()
+
+    def _attach(self, span, parent=None):
+        if parent is None:
+            parent = self._parent()
+        if parent is None:
+            return False
+        with self._lock:
+            parent.children.append(span)
+        return True
+
+    def _close_steps(self, level=None, outcome='ok'):
+        """Closes the open steps of this thread at level or deeper"""
+        stack = self._stack()
+        while stack and stack[-1].kind == 'step' and \
+                (level is None or stack[-1].level >= level):
+            stack.pop().close(outcome)
+
+    def step(self, name):
+        """Marks the beginning of a step, which lasts until the next one
+
+        Steps named like "3.1 -> ..." are nested under the open "3 -> ..."
+        step, and a step ends any open step of the same or deeper level.
+        """
+        match = _STEP_LEVEL_REGEX.match(name)
+        level = match.group(1).count('.') if match else 0
+        self._close_steps(level)
+        span = Span(name, 'step', level=level)
+        if self._attach(span):
+            self._stack().append(span)
+
+    def span(self, name, kind='span', parent=None):
+        """Returns a context manager timing its block as a span
+
+        :param parent: Span. Where to attach the span, by default the
+            current span of this thread. Lets worker threads hang their
+            spans under the span of the thread that started them.
+        """
+        return _SpanContext(self, name, kind, parent)
+
+    def record(self, name, kind, start, end, outcome='ok'):
+        """Adds an already finished span under the current one"""
+        span = Span(name, kind, start=start)
+        span.close(outcome, end=end)
+        self._attach(span)
+
+    def mark_failed(self):
+        """Ends the open steps of this thread as failed, and the test too"""
+        self._failed = True
+        self._close_steps(outcome='error')
+
+    def close(self, outcome='ok'):
+        if self._failed:
+            outcome = 'error'
+        self._close_steps(outcome=outcome)
+        self.root.close(outcome)
+
+    def to_dict(self):
+        return dict(self.root.to_dict(self.root.start),
+                    wall_start=self.wall_start)
+
+    def format_gantt(self, width=50, kinds=('test', 'span', 'step')):
+        """Renders the structural spans as bars over the test's duration
+
+        API calls, waits and ssh commands are not drawn but added up into
+        the line of the span they belong to.
+        """
+        total = max(self.root.duration, 1e-9)
+        lines = []
+        for depth, span in self.root.walk():
+            if span.kind not in kinds:
+                continue
+            offset = int((span.start - self.root.start) / total * width)
+            length = max(int(round(span.duration / total * width)), 1)
+            bar = (' ' * offset + '#' * length)[:width]
+
+            leaves = collections.defaultdict(float)
+            for child in span.children:
+                if child.kind not in kinds:
+                    leaves[child.kind] += child.duration
+            detail = ' '.join('%s %.1fs' % item
+                              for item in sorted(leaves.items()))
+
+            label = ('  ' * depth + span.name)[:45]
+            lines.append(('%-45s |%-*s| %7.1fs %s %s' % (
+                label, width, bar, span.duration, span.outcome or '',
+                detail)).rstrip())
+        return '\n'.join(lines)
+
+
+class _SpanContext(object):
+
+    def __init__(self, timeline, name, kind, parent):
+        self.timeline = timeline
+        self.span = Span(name, kind)
+        self.parent = parent
+        self.attached = False
+
+    def __enter__(self):
+        self.attached = self.timeline._attach(self.span, self.parent)
+        if self.attached:
+            self.timeline._stack().append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        outcome = 'ok' if exc_type is None else 'error'
+        if self.attached:
+            stack = self.timeline._stack()
+            # Steps marked within the span end with it
+            while stack and stack[-1] is not self.span:
+                stack.pop().close(outcome)
+            if stack:
+                stack.pop()
+        self.span.close(outcome)
+
+
+_active = None
+
+
+def activate(timeline):
+    """Makes timeline the one spans are recorded to, None to stop"""
+    global _active
+    _active = timeline
+
+
+def get_active():
+    return _active
+
+
+def record(name, kind, start, end, outcome='ok'):
+    """Records a finished span into the active timeline, if any"""
+    timeline = _active
+    if timeline is not None:
+        timeline.record(name, kind, start, end, outcome)
+
+
+def now():
+    return _clock()
+
+
+def traced(kind, get_name):
+    """Decorator recording every call of a function as a span
+
+    :param kind: string. The kind of the spans, e.g. 'api' or 'ssh'.
+    :param get_name: callable. Receives the arguments of the call and
+        returns the name of the span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            start = _clock()
+            outcome = 'error'
+            try:
+                result = function(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                try:
+                    record(get_name(*args, **kwargs), kind, start, _clock(),
+                           outcome)
+                except Exception:
+                    LOG.debug("Could not record span: %s", sys.exc_info()[1])
+        return wrapper
+    return decorator
+
+
+def instrument(cls, method_name, kind, get_name):
+    """Wraps a method of a class with traced, once"""
+    method = getattr(cls, method_name)
+    if getattr(method, '_timeline_traced', False):
+        return
+    wrapper = traced(kind, get_name)(method)
+    wrapper._timeline_traced = True
+    setattr(cls, method_name, wrapper)
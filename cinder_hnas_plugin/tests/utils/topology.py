@@ -0,0 +1,149 @@
+# Copyright 2016 Hitachi, Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+import logging
+
+from tempest import config
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+
+def config_key(*values):
+    """Hashes the configuration values that define a backend's topology"""
+    blob = json.dumps(values, sort_keys=True)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+
+class TopologyCache(object):
+    """Remembers the EVS layout of each configured HNAS.
+
+    Discovering the EVSes behind a backend takes an 'evs list' over ssc,
+    which is slow. Entries are kept in memory for the whole test process
+    and, if a cache file is given, on disk for later runs as well. Entries
+    are keyed by a hash of the backend configuration, so editing
+    tempest.conf invalidates them, and expire after ttl seconds.
+
+    Entries read from disk are validated once per process with a cheap
+    probe (listing the EVS directories under /mnt/lb), and rediscovered if
+    the layout changed since they were written. The probe does not see EVS
+    IPs change, so HNASCinderBackend rediscovers the layout as well when
+    one of its IPs is missing from it.
+    """
+
+    PROBE_COMMAND = "ls /mnt/lb"
+
+    def __init__(self, path=None, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._validated = set()
+        self._disk_loaded = False
+
+    def get_evs_list(self, key, hnas_client):
+        """Returns the rows of 'evs list' for the HNAS behind a client.
+
+        :param key: string. As returned by config_key.
+        :param hnas_client: HNASClient. Used to probe and, if needed,
+            discover the layout.
+        :returns: list of dicts. A private copy of the cached rows.
+        """
+        with self._lock:
+            self._load_from_disk()
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['timestamp'] > \
+                    self.ttl:
+                LOG.debug("Cached topology %s expired.", key)
+                entry = None
+
+            if entry is not None and key not in self._validated:
+                probe = self._probe(hnas_client)
+                if probe != entry['probe']:
+                    LOG.info("EVS layout of %s changed, rediscovering it.",
+                             hnas_client.ip_address)
+                    entry = None
+                else:
+                    self._validated.add(key)
+
+            if entry is None:
+                entry = {'timestamp': time.time(),
+                         'probe': self._probe(hnas_client),
+                         'evs': [dict(row) for row in
+                                 hnas_client.evs_list()]}
+                self._entries[key] = entry
+                self._validated.add(key)
+                self._save_to_disk()
+
+            return copy.deepcopy(entry['evs'])
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._validated.clear()
+            else:
+                self._entries.pop(key, None)
+                self._validated.discard(key)
+            self._save_to_disk()
+
+    def _probe(self, hnas_client):
+        return sorted(hnas_client.exec_command(self.PROBE_COMMAND).split())
+
+    def _load_from_disk(self):
+        if self._disk_loaded or not self.path:
+            return
+        self._disk_loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self._entries.update(json.load(f))
+        except (IOError, ValueError) as e:
+            LOG.warning("Ignoring unreadable topology cache %s: %s",
+                        self.path, e)
+
+    def _save_to_disk(self):
+        if not self.path:
+            return
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            LOG.warning("Could not write topology cache %s: %s",
+                        self.path, e)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the process-wide TopologyCache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TopologyCache(CONF.hnas.topology_cache_file,
+                                   CONF.hnas.topology_cache_ttl)
+        return _cache
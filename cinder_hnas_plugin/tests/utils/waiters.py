@@ -11,9 +11,14 @@
 #    under the License.
 
 
+import collections
+import contextlib
+import random
+import threading
 import time
 
 from oslo_log import log as logging
+import six
 
 from tempest.common import image as common_image
 from tempest import config
@@ -22,10 +27,239 @@ from tempest.lib.common.utils import test_utils
 from tempest.lib import exceptions as lib_exc
 from tempest.lib.services.image.v1 import images_client as images_v1_client
 
+from cinder_hnas_plugin.tests.utils import timeline
+
 CONF = config.CONF
 LOG = logging.getLogger(__name__)
 
 
+WaitMetric = collections.namedtuple(
+    'WaitMetric', ['resource', 'outcome', 'elapsed', 'polls', 'started'])
+
+_metrics_lock = threading.Lock()
+_wait_metrics = []
+_observers = threading.local()
+
+
+def get_wait_metrics():
+    """Returns a WaitMetric for every wait performed so far."""
+    with _metrics_lock:
+        return list(_wait_metrics)
+
+
+@contextlib.contextmanager
+def observe_waits():
+    """Collects the WaitMetric of every wait the current thread performs
+
+    Yields a list that grows as waits within the block finish, which tells
+    how much of an operation was spent waiting for it to complete.
+    """
+    stack = getattr(_observers, 'stack', None)
+    if stack is None:
+        stack = _observers.stack = []
+    observed = []
+    stack.append(observed)
+    try:
+        yield observed
+    finally:
+        stack.remove(observed)
+
+
+# Prefix of the resource of the WaitMetrics recorded by retry, which waits
+# for arbitrary calls rather than for cinder resources
+RETRY_PREFIX = 'retry '
+
+
+def is_resource_wait(metric):
+    """Whether a WaitMetric was a wait for a cinder resource"""
+    return not metric.resource.startswith(RETRY_PREFIX)
+
+
+def _record_wait(resource, outcome, elapsed, polls, started):
+    LOG.debug("Waited %.2f s (%d polls) for %s: %s", elapsed, polls,
+              resource, outcome)
+    metric = WaitMetric(resource, outcome, elapsed, polls, started)
+    with _metrics_lock:
+        _wait_metrics.append(metric)
+    for observed in getattr(_observers, 'stack', ()):
+        observed.append(metric)
+
+
+class Backoff(object):
+    """Produces exponentially growing, jittered sleep intervals.
+
+    :param max_interval: float. No interval will be longer than this.
+    :param initial: float. The first interval. Defaults to
+        CONF.hnas.waiter_initial_interval.
+    :param factor: float. Growth factor between intervals. Defaults to
+        CONF.hnas.waiter_backoff_factor.
+    :param jitter: float. Fraction of each interval that is randomly added
+        or removed. Defaults to CONF.hnas.waiter_jitter.
+    """
+
+    def __init__(self, max_interval, initial=None, factor=None, jitter=None):
+        if initial is None:
+            initial = CONF.hnas.waiter_initial_interval
+        if factor is None:
+            factor = CONF.hnas.waiter_backoff_factor
+        if jitter is None:
+            jitter = CONF.hnas.waiter_jitter
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self._interval = min(initial, max_interval)
+
+    def next_interval(self):
+        interval = self._interval
+        self._interval = min(self._interval * self.factor, self.max_interval)
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(interval, 0)
+
+
+def wait_until(fetch, is_done, timeout, max_interval, check_failure=None,
+               get_state=None, resource='resource', timeout_message=None):
+    """Polls a resource until it reaches a terminal state.
+
+    The first poll happens right away and the following ones back off
+    exponentially (see Backoff) up to max_interval, so fast operations
+    return almost immediately while slow ones don't hammer the APIs.
+
+    :param fetch: callable. Returns the current representation of the
+        resource.
+    :param is_done: callable. Receives what fetch returned and tells
+        whether the wait is over.
+    :param timeout: float. Seconds until giving up.
+    :param max_interval: float. Longest sleep between two polls, usually
+        the client's build_interval.
+    :param check_failure: callable. Receives what fetch returned and raises
+        if the resource reached an error state.
+    :param get_state: callable. Receives what fetch returned and returns a
+        printable state, used to log state transitions.
+    :param resource: string. Describes what is being waited for in logs
+        and metrics.
+    :param timeout_message: callable. Receives what fetch returned last and
+        returns the message of the TimeoutException.
+    :returns: whatever fetch returned last.
+    :raises: TimeoutException if the deadline passes.
+    """
+    start = time.time()
+    span_start = timeline.now()
+    deadline = start + timeout
+    backoff = Backoff(max_interval)
+    polls = 0
+    state = None
+    outcome = 'error'
+    try:
+        while True:
+            body = fetch()
+            polls += 1
+            if get_state is not None:
+                new_state = get_state(body)
+                if polls > 1 and new_state != state:
+                    LOG.info('%s: state transition "%s" ==> "%s" after '
+                             '%.2f second wait', resource, state, new_state,
+                             time.time() - start)
+                state = new_state
+
+            if is_done(body):
+                outcome = 'done'
+                return body
+            if check_failure is not None:
+                check_failure(body)
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                outcome = 'timeout'
+                if timeout_message is not None:
+                    message = timeout_message(body)
+                else:
+                    message = ('%s did not finish within the required time '
+                               '(%s s).' % (resource, timeout))
+                raise lib_exc.TimeoutException(message)
+            time.sleep(min(backoff.next_interval(), remaining))
+    finally:
+        _record_wait(resource, outcome, time.time() - start, polls, start)
+        timeline.record(resource, 'wait', span_start, timeline.now(),
+                        outcome)
+
+
+# Failures that mean "not yet" (or, for negative checks, "no") rather than
+# a broken test: a command failing on HNAS, e.g. ls on a missing file.
+RETRYABLE_EXCEPTIONS = (lib_exc.SSHExecCommandFailed,)
+
+
+def retry(func, args=(), expect_success=True, timeout=150, max_interval=15,
+          retryable=RETRYABLE_EXCEPTIONS, cancel=None):
+    """Calls func until it returns a truthy value, or a falsy one.
+
+    The first call happens right away, the following ones back off
+    exponentially (see Backoff) up to max_interval, until timeout seconds
+    have passed. Every retry is recorded as a WaitMetric, whose polls are
+    the number of calls.
+
+    :param expect_success: Boolean. Whether to wait for a truthy value. If
+        False, a falsy value or a retryable exception ends the wait.
+    :param retryable: tuple of exception classes. Exceptions that count as
+        a miss. Any other exception is raised.
+    :param cancel: threading.Event. Stops retrying as soon as it is set.
+    :returns: whatever func returned last, or (not expect_success) if it
+        never returned.
+    """
+    name = getattr(func, '__name__', repr(func))
+    start = time.time()
+    span_start = timeline.now()
+    deadline = start + timeout
+    backoff = Backoff(max_interval)
+    attempts = 0
+    result = not expect_success
+    outcome = 'error'
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                outcome = 'cancelled'
+                return result
+            attempts += 1
+            try:
+                result = func(*args)
+            except retryable as e:
+                if not expect_success:
+                    outcome = 'done'
+                    return False
+                LOG.debug("(retry) <%s> raised %s: %s", name,
+                          type(e).__name__, six.text_type(e).split('\n')[0])
+            else:
+                if bool(result) == expect_success:
+                    outcome = 'done'
+                    return result
+                LOG.debug("(retry) <%s> returned <%s> but we expected a %s "
+                          "value", name, result, expect_success)
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                outcome = 'timeout'
+                LOG.debug("(retry) Giving up on <%s> after %d attempts.",
+                          name, attempts)
+                return result
+            interval = min(backoff.next_interval(), remaining)
+            if cancel is not None:
+                cancel.wait(interval)
+            else:
+                time.sleep(interval)
+    finally:
+        _record_wait(RETRY_PREFIX + name, outcome, time.time() - start,
+                     attempts, start)
+        timeline.record(RETRY_PREFIX + name, 'wait', span_start,
+                        timeline.now(), outcome)
+
+
+def _with_caller(message):
+    caller = test_utils.find_test_caller()
+    if caller:
+        message = '(%s) %s' % (caller, message)
+    return message
+
+
 # NOTE(afazekas): This function needs to know a token and a subject.
 def wait_for_server_status(client, server_id, status, ready_wait=True,
                            extra_timeout=0, raise_on_error=True):
@@ -34,86 +268,80 @@ def wait_for_server_status(client, server_id, status, ready_wait=True,
     def _get_task_state(body):
         return body.get('OS-EXT-STS:task_state', None)
 
-    # NOTE(afazekas): UNKNOWN status possible on ERROR
-    # or in a very early stage.
-    body = client.show_server(server_id)['server']
-    old_status = server_status = body['status']
-    old_task_state = task_state = _get_task_state(body)
-    start_time = int(time.time())
-    timeout = client.build_timeout + extra_timeout
-    while True:
+    def _is_done(body):
+        server_status = body['status']
         # NOTE(afazekas): Now the BUILD status only reached
         # between the UNKNOWN->ACTIVE transition.
         # TODO(afazekas): enumerate and validate the stable status set
         if status == 'BUILD' and server_status != 'UNKNOWN':
-            return
-        if server_status == status:
-            if ready_wait:
-                if status == 'BUILD':
-                    return
-                # NOTE(afazekas): The instance is in "ready for action state"
-                # when no task in progress
-                if task_state is None:
-                    # without state api extension 3 sec usually enough
-                    time.sleep(CONF.compute.ready_wait)
-                    return
-            else:
-                return
-
-        time.sleep(client.build_interval)
-        body = client.show_server(server_id)['server']
-        server_status = body['status']
-        task_state = _get_task_state(body)
-        if (server_status != old_status) or (task_state != old_task_state):
-            LOG.info('State transition "%s" ==> "%s" after %d second wait',
-                     '/'.join((old_status, str(old_task_state))),
-                     '/'.join((server_status, str(task_state))),
-                     time.time() - start_time)
-        if (server_status == 'ERROR') and raise_on_error:
+            return True
+        if server_status != status:
+            return False
+        # NOTE(afazekas): The instance is in "ready for action state"
+        # when no task in progress
+        return not ready_wait or _get_task_state(body) is None
+
+    def _check_failure(body):
+        if (body['status'] == 'ERROR') and raise_on_error:
             if 'fault' in body:
                 raise exceptions.BuildErrorException(body['fault'],
                                                      server_id=server_id)
             else:
                 raise exceptions.BuildErrorException(server_id=server_id)
 
-        timed_out = int(time.time()) - start_time >= timeout
-
-        if timed_out:
-            expected_task_state = 'None' if ready_wait else 'n/a'
-            message = ('Server %(server_id)s failed to reach %(status)s '
-                       'status and task state "%(expected_task_state)s" '
-                       'within the required time (%(timeout)s s).' %
-                       {'server_id': server_id,
-                        'status': status,
-                        'expected_task_state': expected_task_state,
-                        'timeout': timeout})
-            message += ' Current status: %s.' % server_status
-            message += ' Current task state: %s.' % task_state
-            caller = test_utils.find_test_caller()
-            if caller:
-                message = '(%s) %s' % (caller, message)
-            raise lib_exc.TimeoutException(message)
-        old_status = server_status
-        old_task_state = task_state
+    def _timeout_message(body):
+        expected_task_state = 'None' if ready_wait else 'n/a'
+        message = ('Server %(server_id)s failed to reach %(status)s '
+                   'status and task state "%(expected_task_state)s" '
+                   'within the required time (%(timeout)s s).' %
+                   {'server_id': server_id,
+                    'status': status,
+                    'expected_task_state': expected_task_state,
+                    'timeout': timeout})
+        message += ' Current status: %s.' % body['status']
+        message += ' Current task state: %s.' % _get_task_state(body)
+        return _with_caller(message)
+
+    # NOTE(afazekas): UNKNOWN status possible on ERROR
+    # or in a very early stage.
+    timeout = client.build_timeout + extra_timeout
+    body = wait_until(
+        lambda: client.show_server(server_id)['server'],
+        _is_done, timeout, client.build_interval,
+        check_failure=_check_failure,
+        get_state=lambda body: '/'.join((body['status'],
+                                         str(_get_task_state(body)))),
+        resource='server %s' % server_id,
+        timeout_message=_timeout_message)
+
+    if ready_wait and status != 'BUILD' and body['status'] == status:
+        # without state api extension 3 sec usually enough
+        time.sleep(CONF.compute.ready_wait)
 
 
 def wait_for_server_termination(client, server_id, ignore_error=False):
     """Waits for server to reach termination."""
-    start_time = int(time.time())
-    while True:
+
+    def _fetch():
         try:
-            body = client.show_server(server_id)['server']
+            return client.show_server(server_id)['server']
         except lib_exc.NotFound:
-            return
+            return None
 
-        server_status = body['status']
-        if server_status == 'ERROR' and not ignore_error:
+    def _check_failure(body):
+        if body['status'] == 'ERROR' and not ignore_error:
             raise exceptions.BuildErrorException(server_id=server_id)
 
-        if int(time.time()) - start_time >= client.build_timeout:
-            raise lib_exc.TimeoutException
-
-        time.sleep(client.build_interval)
+    wait_until(
+        _fetch, lambda body: body is None, client.build_timeout,
+        client.build_interval,
+        check_failure=_check_failure,
+        get_state=lambda body: body['status'] if body else 'DELETED',
+        resource='termination of server %s' % server_id,
+        timeout_message=lambda body: (
+            'Server %s failed to terminate within the required time '
+            '(%s s). Current status: %s.' %
+            (server_id, client.build_timeout, body['status'])))
 
 
 def wait_for_image_status(client, image_id, status):
@@ -134,101 +362,255 @@ def wait_for_image_status(client, image_id, status):
     else:
         show_image = client.show_image
 
-    current_status = 'An unknown status'
-    start = int(time.time())
-    while int(time.time()) - start < client.build_timeout:
+    def _fetch():
         image = show_image(image_id)
         # Compute image client returns response wrapped in 'image' element
         # which is not the case with Glance image client.
         if 'image' in image:
             image = image['image']
+        return image
 
+    def _check_failure(image):
         current_status = image['status']
-        if current_status == status:
-            return
         if current_status.lower() == 'killed':
             raise exceptions.ImageKilledException(image_id=image_id,
                                                   status=status)
         if current_status.lower() == 'error':
             raise exceptions.AddImageException(image_id=image_id)
 
-        time.sleep(client.build_interval)
+    def _timeout_message(image):
+        message = ('Image %(image_id)s failed to reach %(status)s state '
+                   '(current state %(current_status)s) within the required '
+                   'time (%(timeout)s s).' %
+                   {'image_id': image_id,
+                    'status': status,
+                    'current_status': image['status'],
+                    'timeout': client.build_timeout})
+        return _with_caller(message)
 
-    message = ('Image %(image_id)s failed to reach %(status)s state '
-               '(current state %(current_status)s) within the required '
-               'time (%(timeout)s s).' % {'image_id': image_id,
-                                          'status': status,
-                                          'current_status': current_status,
-                                          'timeout': client.build_timeout})
-    caller = test_utils.find_test_caller()
-    if caller:
-        message = '(%s) %s' % (caller, message)
-    raise lib_exc.TimeoutException(message)
+    wait_until(_fetch, lambda image: image['status'] == status,
+               client.build_timeout, client.build_interval,
+               check_failure=_check_failure,
+               get_state=lambda image: image['status'],
+               resource='image %s' % image_id,
+               timeout_message=_timeout_message)
 
 
 def wait_for_volume_status(client, volume_id, status):
     """Waits for a Volume to reach a given status."""
-    body = client.show_volume(volume_id)['volume']
-    volume_status = body['status']
-    start = int(time.time())
 
-    while volume_status != status:
-        time.sleep(client.build_interval)
-        body = client.show_volume(volume_id)['volume']
+    def _check_failure(body):
         volume_status = body['status']
         if volume_status == 'error' and status != 'error':
             raise exceptions.VolumeBuildErrorException(volume_id=volume_id)
         if volume_status == 'error_restoring':
             raise exceptions.VolumeRestoreErrorException(volume_id=volume_id)
 
-        if int(time.time()) - start >= client.build_timeout:
-            message = ('Volume %s failed to reach %s status (current %s) '
-                       'within the required time (%s s).' %
-                       (volume_id, status, volume_status,
-                        client.build_timeout))
-            raise lib_exc.TimeoutException(message)
+    wait_until(
+        lambda: client.show_volume(volume_id)['volume'],
+        lambda body: body['status'] == status,
+        client.build_timeout, client.build_interval,
+        check_failure=_check_failure,
+        get_state=lambda body: body['status'],
+        resource='volume %s' % volume_id,
+        timeout_message=lambda body: (
+            'Volume %s failed to reach %s status (current %s) '
+            'within the required time (%s s).' %
+            (volume_id, status, body['status'], client.build_timeout)))
 
 
 def wait_for_snapshot_status(client, snapshot_id, status):
     """Waits for a Snapshot to reach a given status."""
-    body = client.show_snapshot(snapshot_id)['snapshot']
-    snapshot_status = body['status']
-    start = int(time.time())
-
-    while snapshot_status != status:
-        time.sleep(client.build_interval)
-        body = client.show_snapshot(snapshot_id)['snapshot']
-        snapshot_status = body['status']
-        if snapshot_status == 'error':
+
+    def _check_failure(body):
+        if body['status'] == 'error':
             raise exceptions.SnapshotBuildErrorException(
                 snapshot_id=snapshot_id)
-        if int(time.time()) - start >= client.build_timeout:
-            message = ('Snapshot %s failed to reach %s status (current %s) '
-                       'within the required time (%s s).' %
-                       (snapshot_id, status, snapshot_status,
-                        client.build_timeout))
-            raise lib_exc.TimeoutException(message)
+
+    wait_until(
+        lambda: client.show_snapshot(snapshot_id)['snapshot'],
+        lambda body: body['status'] == status,
+        client.build_timeout, client.build_interval,
+        check_failure=_check_failure,
+        get_state=lambda body: body['status'],
+        resource='snapshot %s' % snapshot_id,
+        timeout_message=lambda body: (
+            'Snapshot %s failed to reach %s status (current %s) '
+            'within the required time (%s s).' %
+            (snapshot_id, status, body['status'], client.build_timeout)))
+
+
+def _wait_for_bulk_status(list_resources, statuses, error_statuses,
+                          raise_failures, max_interval, timeout, kind):
+    """Waits for several resources using a single list call per poll.
+
+    A resource missing from the listing fails right away, as it was either
+    deleted or the listing does not cover it.
+
+    :param list_resources: callable. Returns a list of resource dicts,
+        each one with at least 'id' and 'status'.
+    :param statuses: dict. Maps each resource id to its target status.
+    :param error_statuses: collection of strings. Statuses meaning that a
+        resource failed, unless it happens to be its target status.
+    :param raise_failures: callable. Receives a dict mapping each failed
+        resource id to its status and raises an appropriate exception.
+    :returns: dict. Maps each resource id to its last known representation.
+    """
+    pending = dict(statuses)
+    failed = {}
+    bodies = {}
+
+    def _fetch():
+        return dict((r['id'], r) for r in list_resources()
+                    if r['id'] in pending)
+
+    def _is_done(listed):
+        for res_id in list(pending):
+            body = listed.get(res_id)
+            if body is None:
+                failed[res_id] = 'missing'
+                del pending[res_id]
+                continue
+            bodies[res_id] = body
+            if body['status'] == pending[res_id]:
+                del pending[res_id]
+            elif body['status'] in error_statuses:
+                failed[res_id] = body['status']
+                del pending[res_id]
+        return not pending
+
+    def _timeout_message(listed):
+        current = dict((res_id, bodies[res_id]['status']
+                        if res_id in bodies else 'missing')
+                       for res_id in pending)
+        return _with_caller(
+            '%d %ss failed to reach their target status within the required '
+            'time (%s s). Target: %s. Current: %s.' %
+            (len(pending), kind, timeout,
+             dict((res_id, statuses[res_id]) for res_id in pending),
+             current))
+
+    wait_until(_fetch, _is_done, timeout, max_interval,
+               get_state=lambda listed: len(pending),
+               resource='%d %ss' % (len(statuses), kind),
+               timeout_message=_timeout_message)
+
+    if failed:
+        for res_id, res_status in failed.items():
+            LOG.error("%s %s failed with status %s (expected %s)", kind,
+                      res_id, res_status, statuses[res_id])
+        raise_failures(failed)
+    return bodies
+
+
+def _target_statuses(ids, status):
+    if isinstance(status, dict):
+        return dict(status)
+    return dict((res_id, status) for res_id in ids)
+
+
+def wait_for_volumes_status(client, volume_ids, status, params=None):
+    """Waits for several volumes to reach a given status.
+
+    Instead of showing each volume on every poll, a single detailed volume
+    list is issued per poll. Returns as soon as every volume settles, or
+    raises reporting every volume that failed or went missing.
+
+    :param volume_ids: iterable of volume UUIDs.
+    :param status: string, or dict mapping each volume UUID to the status
+        it is expected to reach. When a dict, volume_ids may be None.
+    :param params: dict. Filters of the volume list, e.g. the name every
+        volume was created with, so that each poll only lists them.
+    :returns: dict. Maps each volume UUID to its last listed details.
+    """
+    statuses = _target_statuses(volume_ids, status)
+
+    def _raise_failures(failed):
+        restoring = [v for v, st in failed.items() if st == 'error_restoring']
+        if restoring:
+            raise exceptions.VolumeRestoreErrorException(
+                volume_id=', '.join(sorted(restoring)))
+        raise exceptions.VolumeBuildErrorException(
+            volume_id=', '.join(sorted(failed)))
+
+    return _wait_for_bulk_status(
+        lambda: client.list_volumes(detail=True, params=params)['volumes'],
+        statuses, ['error', 'error_restoring'], _raise_failures,
+        client.build_interval, client.build_timeout, 'volume')
+
+
+def wait_for_resource_deletion(client, resource_id):
+    """Waits for a resource to be deleted.
+
+    Same as client.wait_for_resource_deletion, but polling with backoff and
+    recording a WaitMetric like every other waiter.
+    """
+    wait_until(
+        lambda: client.is_resource_deleted(resource_id),
+        lambda deleted: deleted,
+        client.build_timeout, client.build_interval,
+        resource='%s %s deletion' % (client.resource_type, resource_id),
+        timeout_message=lambda deleted: _with_caller(
+            'Failed to delete %s %s within the required time (%s s).' %
+            (client.resource_type, resource_id, client.build_timeout)))
+
+
+def wait_for_resources_deletion(list_resources, resource_ids, timeout,
+                                max_interval, kind='resource'):
+    """Waits for several resources to be deleted.
+
+    Bulk counterpart of wait_for_resource_deletion: a single list call per
+    poll, done once none of the resources is listed anymore.
+
+    :param list_resources: callable. Returns a list of resource dicts, each
+        one with at least 'id'.
+    :param resource_ids: iterable of resource ids.
+    :raises: lib_exc.DeleteErrorException if any of them reached
+        error_deleting.
+    """
+    pending = set(resource_ids)
+    if not pending:
+        return
+
+    def _fetch():
+        return dict((r['id'], r) for r in list_resources()
+                    if r['id'] in pending)
+
+    def _check_failure(listed):
+        failed = sorted(res_id for res_id, body in listed.items()
+                        if body.get('status') == 'error_deleting')
+        if failed:
+            raise lib_exc.DeleteErrorException(
+                resource_id=', '.join(failed))
+
+    wait_until(_fetch, lambda listed: not listed, timeout, max_interval,
+               check_failure=_check_failure,
+               get_state=lambda listed: len(listed),
+               resource='%d %ss deletion' % (len(pending), kind),
+               timeout_message=lambda listed: _with_caller(
+                   'Failed to delete %d %ss within the required time '
+                   '(%s s): %s' % (len(listed), kind, timeout,
+                                   sorted(listed))))
 
 
 def wait_for_backup_status(client, backup_id, status):
     """Waits for a Backup to reach a given status."""
-    body = client.show_backup(backup_id)['backup']
-    backup_status = body['status']
-    start = int(time.time())
-
-    while backup_status != status:
-        time.sleep(client.build_interval)
-        body = client.show_backup(backup_id)['backup']
-        backup_status = body['status']
-        if backup_status == 'error' and backup_status != status:
+
+    def _check_failure(body):
+        if body['status'] == 'error':
             raise lib_exc.VolumeBackupException(backup_id=backup_id)
 
-        if int(time.time()) - start >= client.build_timeout:
-            message = ('Volume backup %s failed to reach %s status '
-                       '(current %s) within the required time (%s s).' %
-                       (backup_id, status, backup_status,
-                        client.build_timeout))
-            raise lib_exc.TimeoutException(message)
+    wait_until(
+        lambda: client.show_backup(backup_id)['backup'],
+        lambda body: body['status'] == status,
+        client.build_timeout, client.build_interval,
+        check_failure=_check_failure,
+        get_state=lambda body: body['status'],
+        resource='backup %s' % backup_id,
+        timeout_message=lambda body: (
+            'Volume backup %s failed to reach %s status '
+            '(current %s) within the required time (%s s).' %
+            (backup_id, status, body['status'], client.build_timeout)))
 
 
 def wait_for_qos_operations(client, qos_id, operation, args=None):
@@ -240,49 +622,41 @@ def wait_for_qos_operations(client, qos_id, operation, args=None):
     args = volume-type-id disassociated when operation = 'disassociate'
     args = None when operation = 'disassociate-all'
     """
-    start_time = int(time.time())
-    while True:
-        if operation == 'qos-key-unset':
-            body = client.show_qos(qos_id)['qos_specs']
-            if not any(key in body['specs'] for key in args):
-                return
-        elif operation == 'disassociate':
-            body = client.show_association_qos(qos_id)['qos_associations']
-            if not any(args in body[i]['id'] for i in range(0, len(body))):
-                return
-        elif operation == 'disassociate-all':
-            body = client.show_association_qos(qos_id)['qos_associations']
-            if not body:
-                return
-        else:
-            msg = (" operation value is either not defined or incorrect.")
-            raise lib_exc.UnprocessableEntity(msg)
-
-        if int(time.time()) - start_time >= client.build_timeout:
-            raise lib_exc.TimeoutException
-        time.sleep(client.build_interval)
+    if operation == 'qos-key-unset':
+        def _fetch():
+            return client.show_qos(qos_id)['qos_specs']
+
+        def _is_done(body):
+            return not any(key in body['specs'] for key in args)
+    elif operation == 'disassociate':
+        def _fetch():
+            return client.show_association_qos(qos_id)['qos_associations']
+
+        def _is_done(body):
+            return not any(args in body[i]['id'] for i in range(0, len(body)))
+    elif operation == 'disassociate-all':
+        def _fetch():
+            return client.show_association_qos(qos_id)['qos_associations']
+
+        def _is_done(body):
+            return not body
+    else:
+        msg = (" operation value is either not defined or incorrect.")
+        raise lib_exc.UnprocessableEntity(msg)
+
+    wait_until(_fetch, _is_done, client.build_timeout, client.build_interval,
+               resource='qos %s operation %s' % (qos_id, operation))
 
 
 def wait_for_interface_status(client, server, port_id, status):
     """Waits for an interface to reach a given status."""
-    body = (client.show_interface(server, port_id)
-            ['interfaceAttachment'])
-    interface_status = body['port_state']
-    start = int(time.time())
-
-    while(interface_status != status):
-        time.sleep(client.build_interval)
-        body = (client.show_interface(server, port_id)
-                ['interfaceAttachment'])
-        interface_status = body['port_state']
-
-        timed_out = int(time.time()) - start >= client.build_timeout
-
-        if interface_status != status and timed_out:
-            message = ('Interface %s failed to reach %s status '
-                       '(current %s) within the required time (%s s).' %
-                       (port_id, status, interface_status,
-                        client.build_timeout))
-            raise lib_exc.TimeoutException(message)
-
-    return body
+    return wait_until(
+        lambda: client.show_interface(server, port_id)['interfaceAttachment'],
+        lambda body: body['port_state'] == status,
+        client.build_timeout, client.build_interval,
+        get_state=lambda body: body['port_state'],
+        resource='interface %s' % port_id,
+        timeout_message=lambda body: (
+            'Interface %s failed to reach %s status '
+            '(current %s) within the required time (%s s).' %
+            (port_id, status, body['port_state'], client.build_timeout)))